@@ -1,12 +1,105 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
-from typing import Dict, Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
 import uvicorn
 
-from .engine import generate_response, get_project_context
+from .engine import (MODEL_NAME, REQUEST_TIMEOUT, answer, generate_response, get_project_context,
+                     get_project_contexts, model_manager, prefetch_context, stream_response)
+from .backends import get_router
 from .devices import discover_devices
+from .scheduler import create_scheduler, load as interactive
+from .sessions import MAX_HISTORY_TURNS, SessionStore
+from .shared import LEASE_TTL, multi_process, writer_lease
+from .store import PAGE_SIZE, connect, get_store, record_turn, shutdown as close_store
+from .workers import CancelToken
+from . import memory, stt
 
 app = FastAPI(title="F.R.A.N.C.I.S API")
 
+# Concurrent generations for /chat/batch; scales with the number of Ollama hosts in the pool
+BATCH_CONCURRENCY = get_router().capacity()
+
+# Conversation state for /ws/chat clients
+sessions = SessionStore()
+
+# How often (seconds) a plain HTTP request checks whether its client went away
+DISCONNECT_POLL = 0.5
+
+# Sample rates accepted by /ws/voice
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+# Background jobs (device rediscovery, model prewarm, index rebuild); run by the writer process only
+scheduler = None
+# With several workers, follows the writer lease (see shared.py)
+lease_task = None
+
+
+async def _start_writer():
+    """Start the work only one process should do: model warmup, memory summarization and scheduled jobs."""
+    global scheduler
+    # Load the speech and language models before the first request needs them
+    stt.warm()
+    model_manager.warm_async()
+    # Fold finished conversations into long-term memory in the background
+    memory.start()
+    scheduler = create_scheduler()
+    scheduler.start()
+
+
+async def _stop_writer():
+    global scheduler
+    if scheduler is not None:
+        await scheduler.stop()
+        scheduler = None
+    memory.stop()
+
+
+async def _follow_writer_lease():
+    """Renew (or try to take) the writer lease, starting or stopping the writer's work to match."""
+    lease = writer_lease()
+    while True:
+        try:
+            held = await run_in_threadpool(lease.acquire)
+        except Exception:
+            held = False
+        if held and scheduler is None:
+            await _start_writer()
+        elif not held and scheduler is not None:
+            await _stop_writer()
+        await asyncio.sleep(LEASE_TTL / 3)
+
+
+@app.on_event('startup')
+async def startup():
+    if multi_process():
+        global lease_task
+        lease_task = asyncio.create_task(_follow_writer_lease())
+    else:
+        await _start_writer()
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    if lease_task is not None:
+        lease_task.cancel()
+        await asyncio.gather(lease_task, return_exceptions=True)
+    await _stop_writer()
+    if multi_process():
+        # Let another worker take over without waiting for the lease to expire
+        await run_in_threadpool(writer_lease().release)
+    interactive.close()
+    stt.shutdown()
+    close_store()
+
 
 @app.get('/')
 async def home():
@@ -23,22 +116,50 @@ async def home():
       <form id="chat-form">
         <input id="msg" type="text" placeholder="Say something" style="width:70%" />
         <button type="submit">Send</button>
+        <button type="button" id="cancel">Stop</button>
       </form>
       <pre id="resp"></pre>
       <script>
-        const form = document.getElementById('chat-form');
-        form.addEventListener('submit', async (e) => {
+        // One WebSocket per page; the server keeps the conversation for this session id
+        const respEl = document.getElementById('resp');
+        let ws;
+        function connect() {
+          const sid = localStorage.getItem('francis-session') || '';
+          const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+          ws = new WebSocket(`${proto}://${location.host}/ws/chat?session=${encodeURIComponent(sid)}`);
+          ws.onmessage = (ev) => {
+            const data = JSON.parse(ev.data);
+            if (data.type === 'session') localStorage.setItem('francis-session', data.session);
+            else if (data.type === 'start') respEl.textContent = '';
+            else if (data.type === 'token') respEl.textContent += data.text;
+            else if (data.type === 'cancelled') respEl.textContent += ' [stopped]';
+            else if (data.type === 'error') respEl.textContent = 'Error: ' + data.error;
+          };
+          ws.onclose = () => setTimeout(connect, 1000);
+        }
+        connect();
+        // Fetch context for the partial message once typing pauses, so Send finds it ready
+        let prefetchTimer, prefetchAbort;
+        document.getElementById('msg').addEventListener('input', (e) => {
+          clearTimeout(prefetchTimer);
+          const text = e.target.value.trim();
+          if (text.length < 3) return;
+          prefetchTimer = setTimeout(() => {
+            if (prefetchAbort) prefetchAbort.abort();
+            prefetchAbort = new AbortController();
+            fetch('/prefetch?q=' + encodeURIComponent(text), {method: 'POST', signal: prefetchAbort.signal}).catch(() => {});
+          }, 250);
+        });
+        document.getElementById('chat-form').addEventListener('submit', (e) => {
           e.preventDefault();
           const msg = document.getElementById('msg').value;
-          const respEl = document.getElementById('resp');
+          if (!msg || ws.readyState !== WebSocket.OPEN) return;
+          clearTimeout(prefetchTimer);
           respEl.textContent = 'Thinking...';
-          const r = await fetch('/chat', {
-            method: 'POST',
-            headers: {'Content-Type':'application/json'},
-            body: JSON.stringify({message: msg})
-          });
-          const data = await r.json();
-          respEl.textContent = data.response || JSON.stringify(data);
+          ws.send(JSON.stringify({type: 'message', message: msg}));
+        });
+        document.getElementById('cancel').addEventListener('click', () => {
+          if (ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({type: 'cancel'}));
         });
       </script>
     </body>
@@ -50,44 +171,396 @@ async def home():
 @app.post('/chat')
 @app.get('/chat')
 async def chat(request: Request):
-    """POST /chat expects JSON {message: str}. GET /chat?message=... is supported for quick browser tests."""
+    """POST /chat expects JSON {message: str, session?: str}. GET /chat?message=... is supported for quick browser tests.
+
+    Turns are recorded in the conversation store under ``session`` (a fresh id if omitted).
+    """
     if request.method == 'GET':
         message = request.query_params.get('message')
+        session_id = request.query_params.get('session')
         if not message:
             raise HTTPException(status_code=400, detail="Missing 'message' query parameter")
     else:
         body = await request.json()
         message = body.get('message')
+        session_id = body.get('session')
         if not message:
             raise HTTPException(status_code=400, detail="Missing 'message' field in JSON body")
 
-    context = get_project_context(message)
-    resp = generate_response(message, context)
+    started = time.perf_counter()
+    context_files = []
+    cancel = CancelToken(REQUEST_TIMEOUT)
+    with interactive.track():
+        resp = await _until_disconnected(request, cancel, answer, message, None, None, None,
+                                         context_files.extend, cancel)
+    if cancel.cancel_requested:
+        # The client went away; nobody is waiting for this reply
+        return Response(status_code=499)
+    record_turn(session_id or uuid.uuid4().hex, message, resp, started, context_files, 'http')
     return {"response": resp}
 
 
+async def _until_disconnected(request: Request, cancel: CancelToken, fn, *args):
+    """Run blocking ``fn(*args)`` in the threadpool, cancelling ``cancel`` if the client disconnects first."""
+    work = asyncio.ensure_future(run_in_threadpool(fn, *args))
+    try:
+        while not work.done():
+            await asyncio.wait({work}, timeout=DISCONNECT_POLL)
+            if not work.done() and await request.is_disconnected():
+                cancel.cancel()
+        return work.result()
+    finally:
+        if not work.done():
+            cancel.cancel()
+
+
+async def _stream_tokens(message: str, context: Dict[str, str], history: List[Tuple[str, str]],
+                         cancel: CancelToken) -> AsyncIterator[str]:
+    """Run the blocking token stream in a thread and hand tokens to the event loop as they arrive."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def produce():
+        # Cancelling the token closes the upstream HTTP response, which ends this loop
+        tokens = stream_response(message, context, history, token=cancel)
+        try:
+            for token in tokens:
+                if cancel.cancel_requested:
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, token)
+        finally:
+            # Closing the generator closes the upstream HTTP response
+            tokens.close()
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    producer = loop.run_in_executor(None, produce)
+    while True:
+        token = await queue.get()
+        if token is done:
+            break
+        yield token
+    await producer
+
+
+def _stored_history(session_id: str) -> List[Tuple[str, str]]:
+    store = get_store()
+    if store is None:
+        return []
+    return [(t['prompt'], t['response']) for t in reversed(store.history(session_id, limit=MAX_HISTORY_TURNS))]
+
+
+@app.websocket('/ws/chat')
+async def ws_chat(websocket: WebSocket):
+    """Persistent chat session over a WebSocket.
+
+    Connect with ``?session=<id>`` to resume a conversation; the server answers
+    with ``{type: 'session', session}``. Client messages are JSON:
+    ``{type: 'message', message}`` starts a generation (cancelling any running
+    one), ``{type: 'cancel'}`` stops it, ``{type: 'reset'}`` clears the
+    history. The server streams ``start``, ``token`` events, then ``done`` or
+    ``cancelled`` with the full response text.
+    """
+    await websocket.accept()
+    # A connecting client is likely to ask something soon; load the model if it went cold
+    model_manager.warm_async()
+    session = sessions.get(websocket.query_params.get('session'))
+    if not session.history and websocket.query_params.get('session'):
+        # Resume a conversation from before a server restart
+        session.history = await run_in_threadpool(_stored_history, session.id)
+    send_lock = asyncio.Lock()
+    current: Optional[Tuple[asyncio.Task, CancelToken]] = None
+
+    async def send(msg):
+        async with send_lock:
+            await websocket.send_json(msg)
+
+    async def generate(message: str, cancel: CancelToken):
+        await send({"type": "start", "message": message})
+        started = time.perf_counter()
+        parts = []
+        with interactive.track():
+            context = await run_in_threadpool(get_project_context, message)
+            async for token in _stream_tokens(message, context, session.history, cancel):
+                parts.append(token)
+                await send({"type": "token", "text": token})
+        reply = "".join(parts)
+        if cancel.cancel_requested:
+            await send({"type": "cancelled", "response": reply})
+            return
+        session.add_turn(message, reply)
+        record_turn(session.id, message, reply, started, list(context), 'ws')
+        await send({"type": "done", "response": reply})
+
+    async def stop_current():
+        nonlocal current
+        if current is not None:
+            task, cancel = current
+            current = None
+            cancel.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    await send({"type": "session", "session": session.id, "turns": len(session.history)})
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except ValueError:
+                await send({"type": "error", "error": "Expected a JSON message"})
+                continue
+            kind = data.get('type', 'message')
+            if kind in ('message', 'cancel'):
+                await stop_current()
+            if kind == 'message':
+                message = data.get('message')
+                if not isinstance(message, str) or not message:
+                    await send({"type": "error", "error": "Missing 'message' field"})
+                    continue
+                cancel = CancelToken(REQUEST_TIMEOUT)
+                current = (asyncio.create_task(generate(message, cancel)), cancel)
+            elif kind == 'reset':
+                session.history.clear()
+            elif kind != 'cancel':
+                await send({"type": "error", "error": f"Unknown message type '{kind}'"})
+            session.touch()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if current is not None:
+            current[1].cancel()
+            current[0].cancel()
+
+
+@app.post('/prefetch')
+async def prefetch(q: str):
+    """Speculative context retrieval for partially typed input (see prefetch.py).
+
+    The web UI calls this, debounced, while the user types; the matching
+    files are cached so the eventual message finds its context ready.
+    """
+    model_manager.warm_async([MODEL_NAME])
+    files = await run_in_threadpool(prefetch_context, q)
+    return {"files": files}
+
+
+@app.post('/chat/batch')
+async def chat_batch(request: Request):
+    """POST /chat/batch expects JSON {messages: [str | {id, message}]}.
+
+    Context for every message is retrieved in one pass over the project index,
+    then generations run concurrently (up to BATCH_CONCURRENCY). Results stream
+    back as NDJSON lines in completion order; match them up by ``index``/``id``.
+    """
+    body = await request.json()
+    items = body.get('messages')
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="Missing 'messages' list in JSON body")
+    records = []
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            message, item_id = item.get('message'), item.get('id', i)
+        else:
+            message, item_id = item, i
+        if not isinstance(message, str) or not message:
+            raise HTTPException(status_code=400, detail=f"Message {i} is empty or not a string")
+        records.append((i, item_id, message))
+
+    contexts = await run_in_threadpool(get_project_contexts, [m for _, _, m in records])
+    sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tokens = [CancelToken() for _ in records]
+
+    async def run(record, context, cancel):
+        i, item_id, message = record
+        async with sem:
+            # Each message gets the full deadline once it starts, not while it waits its turn
+            cancel.deadline = time.monotonic() + REQUEST_TIMEOUT
+            with interactive.track():
+                resp = await run_in_threadpool(generate_response, message, context, None, cancel)
+        return {"index": i, "id": item_id, "message": message, "response": resp}
+
+    async def results():
+        tasks = [asyncio.create_task(run(r, c, t)) for r, c, t in zip(records, contexts, tokens)]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield json.dumps(await done) + "\n"
+        finally:
+            # The client stopped reading: abort generations still streaming upstream
+            for task, cancel in zip(tasks, tokens):
+                cancel.cancel()
+                task.cancel()
+
+    return StreamingResponse(results(), media_type='application/x-ndjson')
+
+
 @app.post('/voice')
 async def voice(file: UploadFile = File(...)):
-    # Basic voice endpoint: save file and attempt to transcribe if SpeechRecognition available
+    # Transcribe with the shared STT worker, then answer like /chat
     content = await file.read()
     try:
-        import speech_recognition as sr
-        from io import BytesIO
-        audio_data = BytesIO(content)
-        r = sr.Recognizer()
-        with sr.AudioFile(audio_data) as source:
-            audio = r.record(source)
-        text = r.recognize_google(audio)
-        context = get_project_context(text)
-        resp = generate_response(text, context)
+        text = await run_in_threadpool(stt.transcribe, content)
+    except stt.TranscriptionError as e:
+        return {"error": str(e)}
+    try:
+        started = time.perf_counter()
+        with interactive.track():
+            context = await run_in_threadpool(get_project_context, text)
+            resp = await run_in_threadpool(generate_response, text, context, None, CancelToken(REQUEST_TIMEOUT))
+        record_turn(uuid.uuid4().hex, text, resp, started, list(context), 'voice')
         return {"transcript": text, "response": resp}
-    except ImportError:
-        # SpeechRecognition not installed
-        return {"error": "Speech recognition not available. Install 'speechrecognition' to enable voice."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.websocket('/ws/voice')
+async def ws_voice(websocket: WebSocket):
+    """Streaming voice: binary frames of 16-bit mono PCM in, JSON events out.
+
+    Query parameter ``rate`` sets the sample rate (default 16000). The server
+    pushes ``partial`` transcripts while audio arrives, a ``transcript`` at each
+    end of utterance and a ``response`` once the answer is generated. Sending
+    the text message ``end`` flushes the current utterance.
+    """
+    await websocket.accept()
+    try:
+        rate = int(websocket.query_params.get('rate', stt.SAMPLE_RATE))
+        if not MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+            raise ValueError
+    except ValueError:
+        # 1008: policy violation, with the reason for the client
+        await websocket.close(code=1008, reason=f"'rate' must be an integer between {MIN_SAMPLE_RATE} and "
+                                                f"{MAX_SAMPLE_RATE}")
+        return
+    try:
+        stream = await run_in_threadpool(stt.open_stream, rate)
+    except stt.TranscriptionError as e:
+        await websocket.send_json({"type": "error", "error": str(e)})
+        await websocket.close()
+        return
+
+    send_lock = asyncio.Lock()
+    tasks: Dict[asyncio.Task, CancelToken] = {}
+
+    async def send(msg):
+        async with send_lock:
+            await websocket.send_json(msg)
+
+    async def reply(text, cancel):
+        # Retrieval and generation start while further audio keeps streaming in
+        await send({"type": "transcript", "text": text})
+        with interactive.track():
+            context = await run_in_threadpool(get_project_context, text)
+            resp = await run_in_threadpool(generate_response, text, context, None, cancel)
+        await send({"type": "response", "transcript": text, "response": resp})
+
+    def dispatch(text):
+        if text.strip():
+            cancel = CancelToken(REQUEST_TIMEOUT)
+            task = asyncio.create_task(reply(text, cancel))
+            tasks[task] = cancel
+            task.add_done_callback(lambda t: tasks.pop(t, None))
+
+    last_partial = ''
+    try:
+        while True:
+            msg = await websocket.receive()
+            if msg['type'] == 'websocket.disconnect':
+                break
+            try:
+                if msg.get('bytes'):
+                    result = await run_in_threadpool(stream.accept, msg['bytes'])
+                    if 'final' in result:
+                        last_partial = ''
+                        dispatch(result['final'])
+                    elif result.get('partial') and result['partial'] != last_partial:
+                        last_partial = result['partial']
+                        await send({"type": "partial", "text": last_partial})
+                elif msg.get('text') == 'end':
+                    last_partial = ''
+                    dispatch(await run_in_threadpool(stream.finish))
+            except stt.TranscriptionError as e:
+                await send({"type": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task, cancel in list(tasks.items()):
+            cancel.cancel()
+            task.cancel()
+        await run_in_threadpool(stream.close)
+
+
+@app.get('/history')
+async def history(session: Optional[str] = None, before: Optional[int] = None, limit: int = PAGE_SIZE):
+    """Stored turns, newest first. With ``session`` one conversation is paged by
+    turn id (pass the smallest ``id`` returned as ``before``); without it the
+    most recently active sessions are listed.
+    """
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Conversation store unavailable")
+    limit = max(1, min(limit, PAGE_SIZE))
+    if session is None:
+        return {"sessions": await run_in_threadpool(store.sessions, limit)}
+    return {"turns": await run_in_threadpool(store.history, session, before, limit)}
+
+
+@app.get('/history/search')
+async def history_search(q: str, limit: int = 20):
+    """Full-text search over past prompts and responses."""
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Conversation store unavailable")
+    return {"turns": await run_in_threadpool(store.search, q, max(1, min(limit, PAGE_SIZE)))}
+
+
+@app.get('/models')
+async def models():
+    """Load state of the routed models and the keep_alive currently sent to Ollama."""
+    return await run_in_threadpool(model_manager.status)
+
+
+@app.get('/jobs')
+async def jobs():
+    """Scheduled background jobs with their next and last runs."""
+    if scheduler is None and multi_process():
+        # Another worker runs the jobs; the table in the shared database is still current
+        return {"jobs": await run_in_threadpool(_shared_jobs)}
+    return {"jobs": scheduler.jobs() if scheduler is not None else []}
+
+
+def _shared_jobs() -> List[Dict]:
+    conn = connect()
+    try:
+        return [dict(row) for row in conn.execute('SELECT * FROM jobs ORDER BY next_run')]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+@app.post('/jobs/{name}/run')
+async def run_job(name: str):
+    """Make a scheduled job due now; it still waits for interactive requests to finish."""
+    if scheduler is None and multi_process():
+        queued = await run_in_threadpool(_run_shared_job, name)
+    else:
+        queued = scheduler is not None and scheduler.run_now(name)
+    if not queued:
+        raise HTTPException(status_code=404, detail=f"No job named '{name}'")
+    return {"queued": name}
+
+
+def _run_shared_job(name: str) -> bool:
+    # The writer's scheduler picks the new next_run up within a minute
+    conn = connect()
+    try:
+        with conn:
+            return bool(conn.execute('UPDATE jobs SET next_run = ? WHERE name = ?', (time.time(), name)).rowcount)
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
 @app.get('/devices')
 async def devices():
     devs = discover_devices()
@@ -100,5 +573,20 @@ async def favicon():
     return Response(status_code=204)
 
 
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='F.R.A.N.C.I.S API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='server processes; they share the project index, caches and jobs through the database')
+    args = parser.parse_args(argv)
+    if args.workers > 1:
+        # Read by shared.py in every worker process
+        os.environ['FRANCIS_WORKERS'] = str(args.workers)
+        uvicorn.run(f'{__package__}.app:app', host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
+
+
 if __name__ == '__main__':
-    uvicorn.run(app, host='127.0.0.1', port=8000)
+    main()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+# Rendered icons, the scaled logo and the derived theme are cached on disk so a
+# warm start never has to import Pillow.
+CACHE_DIR = os.environ.get('FRANCIS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'francis'))
+LOGO_PATH = os.environ.get('FRANCIS_LOGO', r"C:\Users\ayden\Downloads\62A51B93-2B4B-417F-95B7-F14B733F978C.PNG")
+
+_hashes = {}
+
+
+def file_hash(path: str) -> Optional[str]:
+    """Short content hash of a file, or None if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _hashes:
+        with open(path, 'rb') as f:
+            _hashes[key] = hashlib.sha1(f.read()).hexdigest()[:16]
+    return _hashes[key]
+
+
+def _cache_path(*parts: str) -> str:
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def draw_icon(name: str, size: int = 20, fg: str = '#E0E0E0'):
+    """Draw a simple monochrome icon with Pillow and return the PIL image.
+    Supported names: 'chat','mic','plug','trash','save','copy'.
+    """
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    stroke = max(1, size // 10)
+    fg_rgb = tuple(int(fg.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+    if name == 'chat':
+        # rounded rect bubble
+        draw.rounded_rectangle([(2, 3), (size-3, size-6)], radius=4, outline=fg_rgb, width=stroke)
+        # tail
+        draw.polygon([(size//3, size-6), (size//3 + 4, size-2), (size//3 + 10, size-6)], fill=fg_rgb)
+    elif name == 'mic':
+        # mic head
+        draw.ellipse([(size*0.28, size*0.12), (size*0.72, size*0.6)], outline=fg_rgb, width=stroke)
+        # handle
+        draw.rectangle([(size*0.45, size*0.58), (size*0.55, size*0.82)], fill=fg_rgb)
+    elif name == 'plug':
+        # body
+        draw.rectangle([(size*0.42, size*0.18), (size*0.58, size*0.6)], fill=fg_rgb)
+        # prongs
+        draw.rectangle([(size*0.36, size*0.12), (size*0.42, size*0.22)], fill=fg_rgb)
+        draw.rectangle([(size*0.58, size*0.12), (size*0.64, size*0.22)], fill=fg_rgb)
+    elif name == 'trash':
+        # lid
+        draw.rectangle([(size*0.22, size*0.18), (size*0.78, size*0.3)], fill=fg_rgb)
+        # body
+        draw.rectangle([(size*0.28, size*0.3), (size*0.72, size*0.78)], outline=fg_rgb, width=stroke)
+    elif name == 'save':
+        # simple floppy
+        draw.rectangle([(size*0.18, size*0.18), (size*0.78, size*0.78)], outline=fg_rgb, width=stroke)
+        draw.rectangle([(size*0.32, size*0.28), (size*0.62, size*0.46)], fill=fg_rgb)
+    elif name == 'copy':
+        draw.rectangle([(size*0.28, size*0.22), (size*0.78, size*0.72)], outline=fg_rgb, width=stroke)
+        draw.rectangle([(size*0.18, size*0.32), (size*0.68, size*0.82)], outline=fg_rgb, width=stroke)
+    else:
+        # fallback: circle
+        draw.ellipse([(3, 3), (size-3, size-3)], outline=fg_rgb, width=stroke)
+
+    return img
+
+
+def icon_file(name: str, size: int = 20, fg: str = '#E0E0E0') -> Optional[str]:
+    """Return a cached PNG of the icon, rendering it on first use.
+
+    The key includes this file's hash so editing draw_icon invalidates old renders.
+    """
+    path = os.path.join(CACHE_DIR, 'icons', f"{name}-{size}-{fg.lstrip('#')}-{file_hash(__file__)}.png")
+    if os.path.exists(path):
+        return path
+    try:
+        draw_icon(name, size, fg).save(_cache_path('icons', os.path.basename(path)))
+    except Exception:
+        return None
+    return path
+
+
+def logo_file(max_w: int, max_h: int = None) -> Optional[str]:
+    """Return a cached PNG of the logo scaled to fit ``max_w`` x ``max_h``."""
+    digest = file_hash(LOGO_PATH)
+    if digest is None:
+        return None
+    path = os.path.join(CACHE_DIR, 'logo', f"{digest}-{max_w}x{max_h or 0}.png")
+    if os.path.exists(path):
+        return path
+    try:
+        from PIL import Image
+        img = Image.open(LOGO_PATH)
+        if max_h:
+            img.thumbnail((max_w, max_h), Image.LANCZOS)
+        else:
+            w, h = img.size
+            img = img.resize((max_w, int(h * max_w / w)), Image.LANCZOS)
+        img.save(_cache_path('logo', os.path.basename(path)))
+    except Exception:
+        return None
+    return path
+
+
+def load_theme() -> Dict[str, str]:
+    """Theme colors derived from the logo, cached by the logo's content hash."""
+    digest = file_hash(LOGO_PATH)
+    if digest is None:
+        return {}
+    path = os.path.join(CACHE_DIR, 'theme.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('logo') == digest:
+            return cached['theme']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    try:
+        from PIL import Image, ImageStat
+        small = Image.open(LOGO_PATH).convert('RGB').resize((20, 20))
+        r, g, b = ImageStat.Stat(small).mean
+    except Exception:
+        return {}
+    # Derive a simple accent color from the image (average color)
+    theme = {'accent': '#%02x%02x%02x' % (int(r), int(g), int(b))}
+    # choose contrasting fg/bg
+    luminance = (0.2126*r + 0.7152*g + 0.0722*b)
+    if luminance < 128:
+        # Avoid pure black; choose a very dark gray instead
+        theme['bg'] = '#0f0f0f'
+        theme['fg'] = '#FFFFFF'
+    else:
+        theme['bg'] = '#FFFFFF'
+        theme['fg'] = '#111111'
+    try:
+        with open(_cache_path('theme.json'), 'w', encoding='utf-8') as f:
+            json.dump({'logo': digest, 'theme': theme}, f)
+    except OSError:
+        pass
+    return theme
@@ -0,0 +1,392 @@
+import itertools
+import json
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Hosts and models come from FRANCIS_BACKENDS_FILE (JSON) or the environment:
+#   FRANCIS_OLLAMA_HOSTS=http://box1:11434,http://box2:11434
+#   FRANCIS_MODEL=qwen3:8b  FRANCIS_QUICK_MODEL=qwen3:1.7b  FRANCIS_CODE_MODEL=qwen3:8b
+# The JSON file looks like:
+#   {"hosts": [{"url": "http://box1:11434", "parallel": 4}, ...],
+#    "models": {"default": "qwen3:8b", "quick": "qwen3:1.7b", "code": "qwen3:8b"}}
+DEFAULT_HOST = "http://localhost:11434"
+DEFAULT_MODEL = "qwen3:8b"
+# Concurrent generations each host serves; match the server's OLLAMA_NUM_PARALLEL
+HOST_PARALLEL = int(os.environ.get('OLLAMA_NUM_PARALLEL', '4'))
+
+HEALTH_INTERVAL = 30.0   # seconds between /api/tags checks of healthy hosts
+RETRY_AFTER = 10.0       # seconds before a failed host is tried again
+CONNECT_TIMEOUT = 3.0
+HEALTH_TIMEOUT = 2.0
+# Longest wait for the next streamed chunk (covers loading a cold model)
+READ_TIMEOUT = 300.0
+# An empty generate request loads a model; keep_alive controls how long it stays in memory
+PREWARM_KEEP_ALIVE = '10m'
+PREWARM_TIMEOUT = 300.0
+
+# Request types used by the routing rules
+QUICK, CODE, DEFAULT = 'quick', 'code', 'default'
+QUICK_MAX_WORDS = 12
+CODE_HINTS = re.compile(
+    r"```|\btraceback\b|\bexception\b|\berror\b|\bbug\b|\bdebug|\brefactor|\bfunction\b|\bclass\b|\bmethod\b"
+    r"|\bcode\b|\bimport\b|\bdef\b|\.py\b|\.js\b|\.json\b|\bcompile|\bstack ?trace\b", re.I)
+
+
+class BackendError(Exception):
+    """No backend could serve the request."""
+
+
+class ModelNotFound(BackendError):
+    pass
+
+
+class DeadlineExceeded(BackendError):
+    """The request's deadline passed before generation finished."""
+
+
+class Backend:
+    """One Ollama host and what the router knows about it."""
+
+    def __init__(self, url: str, parallel: int = HOST_PARALLEL):
+        self.url = url.rstrip('/')
+        if self.url.endswith('/api'):
+            self.url = self.url[:-4]
+        self.parallel = max(1, parallel)
+        self.outstanding = 0
+        self.healthy = True
+        self.models: Optional[set] = None  # unknown until the first health check
+        self.checked_at = 0.0
+        self.failed_at = 0.0
+
+    def usable(self, now: float) -> bool:
+        return self.healthy or now - self.failed_at >= RETRY_AFTER
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def __repr__(self):
+        return f"Backend({self.url!r}, outstanding={self.outstanding}, healthy={self.healthy})"
+
+
+def classify(prompt: str, context: Dict[str, str] = None) -> str:
+    """Pick a request type: code questions, short quick exchanges, or the default."""
+    if CODE_HINTS.search(prompt) or any(path != 'README.md' for path in (context or {})):
+        return CODE
+    if len(prompt.split()) <= QUICK_MAX_WORDS:
+        return QUICK
+    return DEFAULT
+
+
+class Router:
+    """Spreads generations over a pool of Ollama hosts.
+
+    Each request goes to the healthy host serving the model with the fewest
+    outstanding requests (relative to its parallelism). Connection failures
+    mark the host down and the request fails over to the next one; a host is
+    retried after RETRY_AFTER seconds and re-checked every HEALTH_INTERVAL.
+    """
+
+    def __init__(self, hosts: Sequence[Backend], models: Dict[str, str]):
+        if not hosts:
+            hosts = [Backend(DEFAULT_HOST)]
+        self.backends: List[Backend] = list(hosts)
+        self.models = {DEFAULT: DEFAULT_MODEL, **models}
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        self._last_check = 0.0
+        self._checking = False
+
+    def model_for(self, kind: str) -> str:
+        return self.models.get(kind) or self.models[DEFAULT]
+
+    def capacity(self) -> int:
+        """Total concurrent generations the pool can serve."""
+        return sum(b.parallel for b in self.backends)
+
+    def _check_one(self, backend: Backend):
+        import requests
+        try:
+            response = requests.get(f"{backend.url}/api/tags", timeout=HEALTH_TIMEOUT)
+            response.raise_for_status()
+            models = {m["name"] for m in response.json().get("models", [])}
+        except Exception:
+            with self._lock:
+                backend.healthy = False
+                backend.failed_at = time.monotonic()
+            return
+        with self._lock:
+            backend.healthy = True
+            backend.models = models
+            backend.checked_at = time.monotonic()
+
+    def check(self, force: bool = False):
+        """Refresh host health and model lists, at most once per HEALTH_INTERVAL unless forced."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_check < HEALTH_INTERVAL:
+                return
+            self._last_check = now
+        with ThreadPoolExecutor(max_workers=len(self.backends)) as ex:
+            list(ex.map(self._check_one, self.backends))
+
+    def check_async(self):
+        """Start a health check in the background if one is due; never waits for it.
+
+        Requests meanwhile route on what is already known: hosts that failed a
+        request are skipped until RETRY_AFTER, and unchecked hosts are assumed
+        to serve every model.
+        """
+        with self._lock:
+            if self._checking or time.monotonic() - self._last_check < HEALTH_INTERVAL:
+                return
+            self._checking = True
+
+        def run():
+            try:
+                self.check()
+            finally:
+                with self._lock:
+                    self._checking = False
+
+        threading.Thread(target=run, name='francis-health', daemon=True).start()
+
+    def available(self, model: str) -> bool:
+        with self._lock:
+            return any(b.healthy and b.models is not None and model in b.models for b in self.backends)
+
+    def _pick(self, model: str, exclude: set) -> Optional[Backend]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [b for b in self.backends
+                          if b not in exclude and b.usable(now) and b.serves(model)]
+            if not candidates:
+                return None
+            # Least outstanding requests; rotate among equally loaded hosts
+            turn = next(self._turn)
+            backend = min(candidates, key=lambda b: (b.outstanding / b.parallel,
+                                                     (self.backends.index(b) - turn) % len(self.backends)))
+            backend.outstanding += 1
+            return backend
+
+    def _release(self, backend: Backend, failed: bool = False):
+        with self._lock:
+            backend.outstanding -= 1
+            if failed:
+                backend.healthy = False
+                backend.failed_at = time.monotonic()
+
+    def loaded(self) -> Dict[str, Dict[str, str]]:
+        """Models resident on each reachable host, from /api/ps: {url: {model: expires_at}}."""
+        import requests
+
+        def ps(backend):
+            try:
+                response = requests.get(f"{backend.url}/api/ps", timeout=HEALTH_TIMEOUT)
+                response.raise_for_status()
+                return backend.url, {m["name"]: m.get("expires_at") for m in response.json().get("models", [])}
+            except Exception:
+                return backend.url, None
+
+        with self._lock:
+            targets = [b for b in self.backends if b.healthy]
+        if not targets:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(targets)) as ex:
+            return {url: models for url, models in ex.map(ps, targets) if models is not None}
+
+    def prewarm(self, model: str, keep_alive=PREWARM_KEEP_ALIVE) -> int:
+        """Load ``model`` on every reachable host that has it; returns how many hosts answered.
+
+        ``keep_alive`` is a duration string such as '10m' or a number of seconds.
+        """
+        import requests
+
+        def warm(backend):
+            try:
+                requests.post(f"{backend.url}/api/generate",
+                              json={"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive},
+                              timeout=(CONNECT_TIMEOUT, PREWARM_TIMEOUT)).raise_for_status()
+                return True
+            except Exception:
+                return False
+
+        with self._lock:
+            targets = [b for b in self.backends if b.healthy and b.serves(model)]
+        if not targets:
+            return 0
+        with ThreadPoolExecutor(max_workers=len(targets)) as ex:
+            return sum(ex.map(warm, targets))
+
+    def generate(self, payload: Dict, token=None) -> Iterator[Dict]:
+        """Stream Ollama /api/generate objects for ``payload``, failing over between hosts.
+
+        Failover only happens before the first chunk arrives, so a response is
+        never stitched together from two hosts. ``token`` (a workers.CancelToken)
+        stops the stream: cancelling it shuts the connection down from the
+        cancelling thread, also while waiting for the first chunk, which makes
+        Ollama stop generating, and the stream ends quietly. Past the token's deadline DeadlineExceeded is raised.
+        """
+        import requests
+        self.check_async()
+        model = payload["model"]
+        tried = set()
+        missing = False
+        while True:
+            if token is not None and token.cancelled:
+                if token.expired:
+                    raise DeadlineExceeded(model)
+                return
+            backend = self._pick(model, tried)
+            if backend is None:
+                with self._lock:
+                    reachable = [b for b in self.backends if b.healthy]
+                if missing or (reachable and not any(b.serves(model) for b in reachable)):
+                    raise ModelNotFound(model)
+                raise BackendError("no Ollama host reachable")
+            tried.add(backend)
+            failed = started = False
+            read_timeout = READ_TIMEOUT
+            if token is not None and token.deadline is not None:
+                read_timeout = max(0.1, min(read_timeout, token.remaining()))
+            # Connections this attempt goes out on; cancelling shuts them down, even before any header arrives
+            sent = []
+            unregister = token.on_cancel(lambda: [_abort(c) for c in list(sent)]) if token is not None else None
+            try:
+                with _open_stream(f"{backend.url}/api/generate", payload, (CONNECT_TIMEOUT, read_timeout),
+                                  sent, token) as response:
+                    if response.status_code == 404:
+                        # This host does not have the model; forget it and try another
+                        missing = True
+                        with self._lock:
+                            if backend.models is not None:
+                                backend.models.discard(model)
+                        continue
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if token is not None and token.cancelled:
+                            break
+                        if line:
+                            started = True
+                            yield json.loads(line)
+                    else:
+                        return
+            except Exception as e:
+                # Reads fail in odd ways once the connection is shut down under them
+                if token is None or not token.cancelled:
+                    if not isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                        raise
+                    failed = True
+                    if started:
+                        raise
+            finally:
+                if unregister is not None:
+                    unregister()
+                self._release(backend, failed)
+
+
+# The hook generate() installs on its own thread while a streaming request is sent
+_stream_state = threading.local()
+_session = None
+_session_lock = threading.Lock()
+
+
+def _streaming_session():
+    """A requests.Session whose connections report to ``_stream_state.on_request`` once a request is sent.
+
+    That lets generate() learn the connection of a request before its response
+    headers arrive, which Ollama only sends with the first chunk.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from urllib3.connection import HTTPConnection, HTTPSConnection
+            from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+            def reporting(base):
+                class Connection(base):
+                    def request(self, *args, **kwargs):
+                        super().request(*args, **kwargs)
+                        hook = getattr(_stream_state, 'on_request', None)
+                        if hook is not None:
+                            hook(self)
+                return Connection
+
+            class Pool(HTTPConnectionPool):
+                ConnectionCls = reporting(HTTPConnection)
+
+            class SecurePool(HTTPSConnectionPool):
+                ConnectionCls = reporting(HTTPSConnection)
+
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, HOST_PARALLEL * 4))
+            adapter.poolmanager.pool_classes_by_scheme = {'http': Pool, 'https': SecurePool}
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def _open_stream(url: str, payload: Dict, timeout, sent: list, token=None):
+    """POST ``payload`` for a streamed response, appending the connection it goes out on to ``sent``."""
+    def on_request(connection):
+        sent.append(connection)
+        if token is not None and token.cancelled:
+            _abort(connection)  # cancelled before the hook was seen
+    _stream_state.on_request = on_request
+    try:
+        return _streaming_session().post(url, json=payload, stream=True, timeout=timeout)
+    finally:
+        _stream_state.on_request = None
+
+
+def _abort(connection):
+    """Shut down a connection's socket from another thread.
+
+    Closing alone does not wake a reader blocked in recv (e.g. while Ollama
+    loads the model or evaluates the prompt); a shutdown does, and Ollama sees
+    the disconnect and stops generating.
+    """
+    sock = connection.sock
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _load_config() -> Router:
+    path = os.environ.get('FRANCIS_BACKENDS_FILE')
+    config = {}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    hosts = [Backend(h['url'], h.get('parallel', HOST_PARALLEL)) if isinstance(h, dict) else Backend(h)
+             for h in config.get('hosts', [])]
+    if not hosts:
+        urls = os.environ.get('FRANCIS_OLLAMA_HOSTS') or os.environ.get('OLLAMA_HOST') or DEFAULT_HOST
+        hosts = [Backend(u if '://' in u else 'http://' + u) for u in (u.strip() for u in urls.split(',')) if u]
+    default = os.environ.get('FRANCIS_MODEL', DEFAULT_MODEL)
+    models = {DEFAULT: default,
+              QUICK: os.environ.get('FRANCIS_QUICK_MODEL', default),
+              CODE: os.environ.get('FRANCIS_CODE_MODEL', default)}
+    models.update(config.get('models', {}))
+    return Router(hosts, models)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> Router:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = _load_config()
+        return _router
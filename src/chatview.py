@@ -0,0 +1,103 @@
+import itertools
+import threading
+from collections import deque
+from typing import List, Tuple
+
+MAX_MESSAGES = 1000  # kept in memory for save/copy
+MAX_VISIBLE = 200    # rendered in the widget; older messages are evicted from it
+FLUSH_INTERVAL_MS = 33
+
+PREFIXES = {'user': 'You: ', 'assistant': 'F.R.A.N.C.I.S: ', 'system': ''}
+
+
+class Message:
+    __slots__ = ('id', 'role', 'parts', 'done')
+
+    def __init__(self, msg_id: int, role: str):
+        self.id = msg_id
+        self.role = role
+        self.parts = []
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+class ChatModel:
+    """Widget-independent chat transcript.
+
+    Messages live in a capped list; every change is also recorded as a render
+    op that the view applies in one batch per frame (``take_ops``), so
+    streamed tokens cost one widget update per frame rather than one per token.
+    ``append`` may be called from worker threads.
+    """
+
+    def __init__(self, max_messages: int = MAX_MESSAGES):
+        self._lock = threading.Lock()
+        self._messages = deque(maxlen=max_messages)
+        self._open = {}
+        self._ops = []
+        self._ids = itertools.count(1)
+        self.last_response = ''
+
+    def add(self, role: str, text: str = '', done: bool = True) -> int:
+        """Add a message; with ``done=False`` it stays open for streamed appends."""
+        with self._lock:
+            msg = Message(next(self._ids), role)
+            if text:
+                msg.parts.append(text)
+            self._messages.append(msg)
+            self._ops.append(('add', msg.id, PREFIXES.get(role, '') + text))
+            if done:
+                self._close(msg)
+            else:
+                self._open[msg.id] = msg
+            return msg.id
+
+    def append(self, msg_id: int, text: str) -> bool:
+        """Stream text into an open message. Returns False once the message is finished."""
+        with self._lock:
+            msg = self._open.get(msg_id)
+            if msg is None:
+                return False
+            msg.parts.append(text)
+            if self._ops and self._ops[-1][0] == 'append' and self._ops[-1][1] == msg_id:
+                self._ops[-1] = ('append', msg_id, self._ops[-1][2] + text)
+            else:
+                self._ops.append(('append', msg_id, text))
+            return True
+
+    def finish(self, msg_id: int, text: str = None, suffix: str = ''):
+        """Close an open message. ``text`` fills it if nothing was streamed."""
+        with self._lock:
+            msg = self._open.pop(msg_id, None)
+            if msg is None:
+                return
+            extra = (text if text and not msg.parts else '') + suffix
+            if extra:
+                msg.parts.append(extra)
+                self._ops.append(('append', msg_id, extra))
+            self._close(msg)
+
+    def _close(self, msg: Message):
+        msg.done = True
+        self._ops.append(('end', msg.id))
+        if msg.role == 'assistant':
+            self.last_response = msg.text
+
+    def clear(self):
+        with self._lock:
+            self._messages.clear()
+            self._open.clear()
+            self._ops = [('clear', 0)]
+            self.last_response = ''
+
+    def take_ops(self) -> List[Tuple]:
+        with self._lock:
+            ops, self._ops = self._ops, []
+            return ops
+
+    def transcript(self) -> str:
+        with self._lock:
+            return '\n'.join(PREFIXES.get(m.role, '') + m.text for m in self._messages)
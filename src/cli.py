@@ -0,0 +1,153 @@
+import argparse
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, TextIO, Tuple
+
+try:
+    from backends import get_router
+    from engine import REQUEST_TIMEOUT, answer, generate_response, get_project_contexts
+    from store import record_turn, shutdown as close_store
+    from workers import CancelToken
+except Exception:
+    from src.backends import get_router
+    from src.engine import REQUEST_TIMEOUT, answer, generate_response, get_project_contexts
+    from src.store import record_turn, shutdown as close_store
+    from src.workers import CancelToken
+
+# Concurrent generations in batch mode; the pool's total parallelism across Ollama hosts
+BATCH_CONCURRENCY = get_router().capacity()
+
+
+def run_repl(stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout):
+    """Interactive terminal conversation. Responses stream as they are generated."""
+    history: List[Tuple[str, str]] = []
+    session_id = uuid.uuid4().hex
+    stdout.write("F.R.A.N.C.I.S ready. Type 'exit' to quit, 'reset' to forget the conversation.\n")
+    while True:
+        stdout.write('You: ')
+        stdout.flush()
+        line = stdin.readline()
+        if not line:
+            break
+        prompt = line.strip()
+        if not prompt:
+            continue
+        if prompt.lower() in ('exit', 'quit'):
+            break
+        if prompt.lower() == 'reset':
+            history.clear()
+            continue
+
+        stdout.write('F.R.A.N.C.I.S: ')
+        stdout.flush()
+
+        def on_token(token):
+            stdout.write(token)
+            stdout.flush()
+
+        started = time.perf_counter()
+        context_files = []
+        cancel = CancelToken(REQUEST_TIMEOUT)
+        try:
+            reply = answer(prompt, on_token=on_token, history=history, on_context=context_files.extend,
+                           token=cancel)
+        except KeyboardInterrupt:
+            cancel.cancel()
+            stdout.write('\n[interrupted]\n')
+            continue
+        stdout.write('\n')
+        history.append((prompt, reply))
+        record_turn(session_id, prompt, reply, started, context_files, 'cli')
+
+
+def _read_prompts(source: TextIO) -> Iterator[Dict]:
+    """Yield {'id', 'prompt'} records from JSONL objects or plain text lines."""
+    for n, line in enumerate(source, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record = None
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+        if not isinstance(record, dict) or 'prompt' not in record:
+            record = {'prompt': line}
+        record.setdefault('id', n)
+        yield record
+
+
+def run_batch(source: TextIO, out: TextIO = sys.stdout, concurrency: int = BATCH_CONCURRENCY) -> int:
+    """Answer every prompt from ``source`` concurrently and write one JSON result per line.
+
+    Results are written as they complete; use the ``id`` field to match them
+    with their input. Returns the number of prompts processed.
+    """
+    records = list(_read_prompts(source))
+    session_id = 'batch-' + uuid.uuid4().hex
+    # Retrieve context for every prompt in one pass over the project index
+    contexts = get_project_contexts([r['prompt'] for r in records])
+    tokens = [CancelToken() for _ in records]
+
+    def work(record, context, cancel):
+        start = time.perf_counter()
+        # The deadline starts when the prompt does, not while it is queued
+        cancel.deadline = time.monotonic() + REQUEST_TIMEOUT
+        try:
+            response, error = generate_response(record['prompt'], context, None, cancel), None
+        except Exception as e:
+            response, error = None, str(e)
+        result = {'id': record['id'], 'prompt': record['prompt'], 'response': response,
+                  'elapsed': round(time.perf_counter() - start, 3)}
+        if error:
+            result['error'] = error
+        else:
+            record_turn(session_id, record['prompt'], response, start, list(context), 'batch')
+        return result
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = [ex.submit(work, r, c, t) for r, c, t in zip(records, contexts, tokens)]
+        try:
+            for future in as_completed(futures):
+                out.write(json.dumps(future.result()) + '\n')
+                out.flush()
+                count += 1
+        except KeyboardInterrupt:
+            # Stop queued prompts and abort the generations in flight instead of waiting for them
+            for future, cancel in zip(futures, tokens):
+                future.cancel()
+                cancel.cancel()
+            raise
+    return count
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='F.R.A.N.C.I.S terminal client')
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                        help="answer prompts from FILE (or stdin with '-'), one per line or JSONL, and print JSONL results")
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help=f'concurrent generations in batch mode (default {BATCH_CONCURRENCY})')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.batch is None:
+            try:
+                run_repl()
+            except KeyboardInterrupt:
+                print()
+        elif args.batch == '-':
+            run_batch(sys.stdin, concurrency=args.concurrency)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                run_batch(f, concurrency=args.concurrency)
+    finally:
+        close_store()
+
+
+if __name__ == '__main__':
+    main()
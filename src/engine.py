@@ -1,12 +1,59 @@
-import requests
 import json
 import os
 import glob
-from typing import List, Dict
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterator, List, Dict, Sequence, Tuple
 
-OLLAMA_BASE_URL = "http://localhost:11434/api"
-MODEL_NAME = "qwen3:8b"
+try:
+    from project_index import ProjectIndex
+    from prefetch import ContextPrefetcher
+    from structure import StructureIndex
+    from summaries import get_summary_cache
+    from shared import ResponseCache, get_response_cache, get_shared_index, is_writer
+    from memory import recall
+    from backends import BackendError, DeadlineExceeded, ModelNotFound, QUICK, classify, get_router
+    from intents import handle as handle_command
+except ImportError:
+    from src.project_index import ProjectIndex
+    from src.prefetch import ContextPrefetcher
+    from src.structure import StructureIndex
+    from src.summaries import get_summary_cache
+    from src.shared import ResponseCache, get_response_cache, get_shared_index, is_writer
+    from src.memory import recall
+    from src.backends import BackendError, DeadlineExceeded, ModelNotFound, QUICK, classify, get_router
+    from src.intents import handle as handle_command
+
+# Hosts and per-request-type models are configured in backends.py
+router = get_router()
+MODEL_NAME = router.model_for('default')
+
+# keep_alive (seconds) sent to Ollama, by recent traffic: busy, active, quiet
+KEEP_ALIVE_BUSY = 3600
+KEEP_ALIVE_ACTIVE = 1800
+KEEP_ALIVE_IDLE = 600
+BUSY_REQUESTS = 5        # requests in the last TRAFFIC_WINDOW that count as busy
+TRAFFIC_WINDOW = 600
+# Keep models resident while there was traffic this recently (seconds)
+KEEP_WARM_WINDOW = float(os.environ.get('FRANCIS_KEEP_WARM', str(8 * 3600)))
+# Deadline (seconds) clients give each interactive request, from retrieval to the last token
+REQUEST_TIMEOUT = float(os.environ.get('FRANCIS_REQUEST_TIMEOUT', '300'))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Number of previous (user, assistant) exchanges included in the prompt
+HISTORY_TURNS = 6
+# Full file contents are included up to this many characters; further matches get summaries
+FULL_CONTEXT_CHARS = 24000
+# A query matching more files than this is treated as broad
+TARGETED_MAX_FILES = 5
+BROAD_HINTS = re.compile(
+    r"\b(overview|architecture|all (the )?files|"
+    r"(explain|describe|summari[sz]e) (the |this |my )?(whole |entire )?(project|codebase|code base|repo(sitory)?)|"
+    r"(project|codebase|code base|repo(sitory)?) (structure|layout|organi[sz]ation)|"
+    r"how is (the |this |my )?(project|codebase|code base|code|repo(sitory)?) "
+    r"(structured|organi[sz]ed|laid out|put together)|"
+    r"what does (this|the|my) (project|codebase|code base|repo(sitory)?) do)\b", re.I)
 
 
 def get_file_content(file_path: str) -> str:
@@ -23,45 +70,203 @@ def search_files(pattern: str) -> List[str]:
     return glob.glob(os.path.join(PROJECT_ROOT, pattern), recursive=True)
 
 
-def get_project_context(query: str = None) -> Dict[str, str]:
-    """Get relevant project files and their contents based on query."""
+# Shared, incrementally refreshed view of the project files used for context;
+# with several server workers only the writer walks the tree (see shared.py)
+project_index = ProjectIndex(PROJECT_ROOT, shared=get_shared_index(), is_writer=is_writer)
+# Query matches cached by prefix, filled speculatively while the user types
+context_cache = ContextPrefetcher(project_index)
+# File tree and Python symbol table, re-parsed per changed file
+structure_index = StructureIndex(project_index)
+
+
+def is_broad(query: str, matches: Sequence) -> bool:
+    """Broad questions are about the project as a whole rather than particular files."""
+    return bool(query and BROAD_HINTS.search(query)) or len(matches) > TARGETED_MAX_FILES
+
+
+def _context_for(matches, progress: Callable[[str], None] = None, query: str = None) -> Dict[str, str]:
+    """README, the files the query names, then the other matches: whole files within
+    FULL_CONTEXT_CHARS for targeted questions, summaries for broad ones.
+
+    Named files ("help me understand main.py") are always sent whole while they
+    fit, even in a broad question. Summaries (signatures, docstrings, headings
+    and a cached synopsis) are keyed by content hash, so they cost nothing
+    after the first request.
+    """
     context = {}
 
     # Add README for project overview
-    readme_path = os.path.join(PROJECT_ROOT, 'README.md')
-    if os.path.exists(readme_path):
-        context['README.md'] = get_file_content(readme_path)
+    readme = project_index.get('README.md')
+    if readme is not None:
+        context['README.md'] = readme.content
 
+    summaries = get_summary_cache()
+    named = structure_index.mentioned(query) if query else []
+    others = [f for f in matches if f not in named]
+    broad = is_broad(query, others)
+    if broad:
+        # The tree costs a line per file and answers "what is where" on its own
+        context['(file tree)'] = structure_index.tree()
+    if broad and not others:
+        others = [f for f in project_index.files() if f not in named]
+    budget = FULL_CONTEXT_CHARS
+    for f in sorted(named, key=lambda f: f.size) + sorted(others, key=lambda f: f.size):
+        if f.path in context:
+            continue
+        if f.size <= budget and (not broad or f in named):
+            context[f.path] = f.content
+            budget -= f.size
+        else:
+            context[f"{f.path} (summary)"] = summaries.summary_for(f)
+
+    if progress:
+        progress(f"Selected {len(context)} file{'s' if len(context) != 1 else ''} for context")
+    return context
+
+
+def get_project_context(query: str = None, progress: Callable[[str], None] = None) -> Dict[str, str]:
+    """Get relevant project files and their contents based on query.
+
+    ``progress`` (optional) receives short status messages while the scan runs.
+    """
+    matches = []
     if query:
         # Search for relevant files based on query
-        patterns = ['**/*.py', '**/*.md', '**/*.json']
-        for pattern in patterns:
-            files = search_files(pattern)
-            for file in files:
-                rel_path = os.path.relpath(file, PROJECT_ROOT)
-                content = get_file_content(file)
-                if query.lower() in content.lower():
-                    context[rel_path] = content
+        if progress:
+            progress(f"Scanning {len(project_index.files())} files...")
+        matches = context_cache.matches(query)
+    return _context_for(matches, progress, query)
 
-    return context
+
+def prefetch_context(partial: str, token=None) -> int:
+    """Speculatively match partially typed input so the final query finds its context cached.
+
+    Meant for a debounced, cancellable background job (``token`` is a workers.CancelToken).
+    """
+    return context_cache.prefetch(partial, token)
+
+
+def get_project_contexts(queries: Sequence[str]) -> List[Dict[str, str]]:
+    """Context for several queries, matched in a single pass over the project index."""
+    return [_context_for(matches, query=q)
+            for q, matches in zip(queries, project_index.search_many(queries))]
 
 
 def check_model_availability():
-    try:
-        response = requests.get(f"{OLLAMA_BASE_URL}/tags")
-        if response.status_code == 200:
-            models = response.json().get("models", [])
-            return any(model["name"] == MODEL_NAME for model in models)
-        return False
-    except Exception:
-        return False
-
-
-def generate_response(prompt: str, context: Dict[str, str] = None) -> str:
-    headers = {
-        "Content-Type": "application/json",
-    }
+    """True if some Ollama host in the pool has the default model."""
+    router.check(force=True)
+    return router.available(MODEL_NAME)
+
+
+class ModelManager:
+    """Keeps the configured models resident on the Ollama hosts.
+
+    Every generation is counted; the keep_alive sent with it grows with recent
+    traffic so Ollama does not unload a model between closely spaced requests.
+    ``warm`` loads models ahead of the first request (at startup, or when a
+    client connects), and ``maintain`` re-warms them before they expire while
+    there has been traffic within KEEP_WARM_WINDOW. Cold loads therefore
+    happen in the background rather than on a user's request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = deque(maxlen=1000)
+        self._started = time.monotonic()
+        self._resident_until: Dict[str, float] = {}
+        self._loading: set = set()
+
+    def models(self) -> List[str]:
+        """Distinct models the router may use."""
+        return list(dict.fromkeys(router.models.values()))
+
+    def note_request(self, model: str):
+        now = time.monotonic()
+        with self._lock:
+            self._requests.append(now)
+        keep_alive = self.keep_alive()
+        with self._lock:
+            self._resident_until[model] = now + keep_alive
 
+    def recent_requests(self, window: float = TRAFFIC_WINDOW) -> int:
+        cutoff = time.monotonic() - window
+        with self._lock:
+            return sum(1 for t in self._requests if t >= cutoff)
+
+    def keep_alive(self) -> int:
+        recent = self.recent_requests()
+        if recent >= BUSY_REQUESTS:
+            return KEEP_ALIVE_BUSY
+        if recent or self.recent_requests(3600):
+            return KEEP_ALIVE_ACTIVE
+        return KEEP_ALIVE_IDLE
+
+    def is_warm(self, model: str = MODEL_NAME) -> bool:
+        """Best guess, without asking Ollama, whether ``model`` is still resident."""
+        with self._lock:
+            return self._resident_until.get(model, 0) > time.monotonic()
+
+    def warm(self, models: Sequence[str] = None) -> bool:
+        """Load ``models`` (default: all routed models) now; True if the default model is loaded somewhere."""
+        router.check()
+        ok = False
+        for model in models or self.models():
+            with self._lock:
+                if model in self._loading:
+                    continue
+                self._loading.add(model)
+            try:
+                keep_alive = self.keep_alive()
+                if router.prewarm(model, keep_alive):
+                    with self._lock:
+                        self._resident_until[model] = time.monotonic() + keep_alive
+                    ok = ok or model == MODEL_NAME
+            finally:
+                with self._lock:
+                    self._loading.discard(model)
+        return ok
+
+    def warm_async(self, models: Sequence[str] = None):
+        """Warm in a background thread unless the models already look resident."""
+        pending = [m for m in (models or self.models()) if not self.is_warm(m)]
+        if pending:
+            threading.Thread(target=self.warm, args=(pending,), name='francis-warm', daemon=True).start()
+
+    def maintain(self, horizon: float = 300) -> List[str]:
+        """Re-warm models that expire within ``horizon`` seconds, while traffic is recent enough."""
+        with self._lock:
+            last = self._requests[-1] if self._requests else self._started
+        if time.monotonic() - last > KEEP_WARM_WINDOW:
+            return []
+        deadline = time.monotonic() + horizon
+        with self._lock:
+            due = [m for m in self.models() if self._resident_until.get(m, 0) < deadline]
+        if due:
+            self.warm(due)
+        return due
+
+    def status(self) -> Dict:
+        """Load state of each routed model across hosts, as reported by /api/ps."""
+        resident = router.loaded()
+        models = {}
+        for model in self.models():
+            hosts = {url: loaded[model] for url, loaded in resident.items() if model in loaded}
+            with self._lock:
+                loading = model in self._loading
+            models[model] = {
+                'state': 'loaded' if hosts else 'loading' if loading else 'unloaded',
+                'hosts': hosts,
+            }
+        return {'models': models, 'keep_alive': self.keep_alive(),
+                'recent_requests': self.recent_requests()}
+
+
+model_manager = ModelManager()
+
+
+def build_prompt(prompt: str, context: Dict[str, str] = None,
+                 history: List[Tuple[str, str]] = None,
+                 memories: Sequence[str] = None) -> str:
     # Construct system message for coding assistance
     system_message = (
         "You are F.R.A.N.C.I.S (Facilitating Residential Assistance, Navigation, and Comfort with Intelligent Systems),\n"
@@ -76,38 +281,150 @@ def generate_response(prompt: str, context: Dict[str, str] = None) -> str:
         for file_path, content in context.items():
             context_message += f"\n--- {file_path} ---\n{content}\n"
 
+    # Long-term memories, already trimmed to the memory token budget
+    memory_message = ""
+    if memories:
+        memory_message = "\n\nThings you remember from earlier conversations:\n"
+        memory_message += "".join(f"- {m}\n" for m in memories)
+
+    # Recent conversation turns, oldest first
+    history_message = ""
+    if history:
+        history_message = "\n\nConversation so far:\n"
+        for user_text, reply in history[-HISTORY_TURNS:]:
+            history_message += f"User: {user_text}\nF.R.A.N.C.I.S: {reply}\n"
+
     # Combine messages
-    full_prompt = f"{system_message}\n{context_message}\n\nUser: {prompt}\nF.R.A.N.C.I.S:"
+    return f"{system_message}\n{context_message}{memory_message}{history_message}\n\nUser: {prompt}\nF.R.A.N.C.I.S:"
+
 
+def _stream_generate(full_prompt: str, model: str = MODEL_NAME, temperature: float = 0.7,
+                     interactive: bool = True, token=None, cache: bool = False) -> Iterator[str]:
+    """Stream a completion for an already built prompt from the least busy host.
+
+    Only ``interactive`` requests count as traffic for keep_alive decisions.
+    Errors are yielded as a single "Error: ..." chunk, matching generate_response.
+    Cancelling ``token`` (a workers.CancelToken) ends the stream and the
+    upstream generation; if its deadline passes, a timeout notice ends it.
+    With ``cache`` a finished response is stored in the shared response cache
+    and an identical request is answered from it.
+    """
+    if token is not None and token.cancelled:
+        return
+    responses = get_response_cache() if cache else None
+    if responses is not None:
+        key = ResponseCache.key(model, temperature, full_prompt)
+        cached = responses.get(key)
+        if cached is not None:
+            yield cached
+            return
+    if interactive:
+        model_manager.note_request(model)
     payload = {
-        "model": MODEL_NAME,
+        "model": model,
         "prompt": full_prompt,
-        "stream": False,
+        "stream": True,
+        "keep_alive": model_manager.keep_alive(),
         "options": {
-            "temperature": 0.7,
+            "temperature": temperature,
             "top_p": 0.9
         }
     }
 
+    parts = []
+    produced = False
     try:
-        # First check if model is available
-        if not check_model_availability():
-            return f"Error: Model '{MODEL_NAME}' not found. Please make sure it's pulled using 'ollama pull {MODEL_NAME}'"
+        # Ollama streams one JSON object per line
+        for data in router.generate(payload, token):
+            if data.get("response"):
+                produced = True
+                parts.append(data["response"])
+                yield data["response"]
+            if data.get("done"):
+                if responses is not None and produced:
+                    responses.put(key, "".join(parts))
+                break
+    except DeadlineExceeded:
+        yield " [timed out]" if produced else "Error: The request timed out before the model answered"
+    except ModelNotFound:
+        yield f"Error: Model '{model}' not found. Please make sure it's pulled using 'ollama pull {model}'"
+    except BackendError:
+        yield "Error: Cannot connect to Ollama. Make sure Ollama is running with 'ollama serve'"
+    except Exception as e:
+        yield f"Error: {str(e)}"
 
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/generate",
-            headers=headers,
-            json=payload
-        )
 
-        if response.status_code == 404:
-            return "Error: Cannot connect to Ollama. Make sure Ollama is running with 'ollama serve'"
+def _single(text: str) -> Iterator[str]:
+    yield text
 
-        response.raise_for_status()
-        data = response.json()
-        return data.get("response", "[No response generated]")
 
-    except requests.exceptions.ConnectionError:
-        return "Error: Cannot connect to Ollama. Make sure Ollama is running with 'ollama serve'"
-    except Exception as e:
-        return f"Error: {str(e)}"
+def stream_response(prompt: str, context: Dict[str, str] = None,
+                    history: List[Tuple[str, str]] = None,
+                    memories: Sequence[str] = None, commands: bool = True,
+                    token=None, cache: bool = False) -> Iterator[str]:
+    """Yield response text as Ollama generates it.
+
+    Recognized commands (see intents.py) are answered directly without the
+    model unless ``commands`` is False. Otherwise the model is chosen by
+    request type (see backends.classify). ``memories`` defaults to the
+    long-term memories most relevant to ``prompt``; pass an empty sequence to
+    leave them out. ``token`` cancels the generation and ``cache`` allows a
+    shared cached response (see _stream_generate).
+    """
+    if commands:
+        reply = handle_command(prompt)
+        if reply is not None:
+            return _single(reply)
+    if memories is None:
+        memories = recall(prompt)
+    model = router.model_for(classify(prompt, context))
+    return _stream_generate(build_prompt(prompt, context, history, memories), model, token=token, cache=cache)
+
+
+def complete(text: str, token=None) -> str:
+    """Plain completion of ``text`` on the quick model, without the assistant persona, context or memory."""
+    return "".join(_stream_generate(text, router.model_for(QUICK), temperature=0.2, interactive=False,
+                                    token=token, cache=True))
+
+
+def generate_response(prompt: str, context: Dict[str, str] = None,
+                      history: List[Tuple[str, str]] = None, token=None) -> str:
+    """Complete response for one prompt; stateless requests (no ``history``) may be served from the response cache."""
+    return "".join(stream_response(prompt, context, history, token=token, cache=not history)) \
+        or "[No response generated]"
+
+
+def answer(prompt: str, progress: Callable[[str], None] = None,
+           on_token: Callable[[str], None] = None,
+           history: List[Tuple[str, str]] = None,
+           on_context: Callable[[Dict[str, str]], None] = None,
+           token=None) -> str:
+    """Retrieve context and generate a response as one pipelined job.
+
+    Meant to run off the UI thread; ``progress`` receives status updates for each
+    stage, ``on_token`` (optional) each chunk of the response as it streams in,
+    and ``history`` holds earlier (user, assistant) turns of the conversation.
+    ``on_context`` (optional) receives the retrieved context before generation.
+    ``token`` (a workers.CancelToken) stops the job between stages and aborts
+    the generation mid-stream; whatever was produced so far is returned.
+    """
+    # Commands like "list devices" skip context retrieval and the model entirely
+    reply = handle_command(prompt)
+    if reply is not None:
+        if on_token:
+            on_token(reply)
+        return reply
+
+    context = get_project_context(prompt, progress=progress)
+    if on_context:
+        on_context(context)
+    if token is not None and token.cancelled:
+        return ""
+    if progress:
+        progress('Generating response...')
+    parts = []
+    for chunk in stream_response(prompt, context, history, commands=False, token=token):
+        parts.append(chunk)
+        if on_token:
+            on_token(chunk)
+    return "".join(parts) or "[No response generated]"
@@ -2,37 +2,34 @@ from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QLineEdit, QTextEdit, QLabel, QFileDialog, QListWidget, QTabWidget
 )
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QTextCursor
 import sys
+import time
+import uuid
 
 try:
     # Prefer local imports (when running as script)
-    from engine import generate_response, get_project_context, check_model_availability
+    from engine import REQUEST_TIMEOUT, answer, check_model_availability, model_manager
     from devices import discover_devices
+    import memory
+    import stt
+    from workers import get_service
+    from chatview import ChatModel, FLUSH_INTERVAL_MS, MAX_VISIBLE
+    from store import record_turn, shutdown as close_store
 except Exception:
     # Fallback when running as package
-    from src.engine import generate_response, get_project_context, check_model_availability
+    from src.engine import REQUEST_TIMEOUT, answer, check_model_availability, model_manager
     from src.devices import discover_devices
+    from src import memory, stt
+    from src.workers import get_service
+    from src.chatview import ChatModel, FLUSH_INTERVAL_MS, MAX_VISIBLE
+    from src.store import record_turn, shutdown as close_store
 
-
-class Worker(QThread):
-    finished = Signal(str)
-
-    def __init__(self, fn, *args):
-        super().__init__()
-        self.fn = fn
-        self.args = args
-
-    def run(self):
-        try:
-            res = self.fn(*self.args)
-            if isinstance(res, str):
-                out = res
-            else:
-                out = str(res)
-            self.finished.emit(out)
-        except Exception as e:
-            self.finished.emit(f"Error: {e}")
+# How often the UI thread drains results posted by background jobs
+DISPATCH_INTERVAL_MS = 16
+# How often the model is re-warmed while the window is open
+MAINTAIN_INTERVAL_MS = 240000
 
 
 class FrancisGUI(QWidget):
@@ -53,14 +50,52 @@ class FrancisGUI(QWidget):
         self._build_voice_tab()
         self._build_devices_tab()
 
+        # Background jobs run on the shared pool; their results come back through one dispatch queue
+        self.jobs = get_service()
+        self._dispatch_timer = QTimer(self)
+        self._dispatch_timer.timeout.connect(self.jobs.dispatcher.drain)
+        self._dispatch_timer.start(DISPATCH_INTERVAL_MS)
+        self._render_timer = QTimer(self)
+        self._render_timer.timeout.connect(self._render_chat)
+        self._render_timer.start(FLUSH_INTERVAL_MS)
+
+        # Turns from this window are recorded under one conversation
+        self.session_id = uuid.uuid4().hex
         self.update_model_status()
+        self.jobs.submit(memory.start)
+        self._maintain_timer = QTimer(self)
+        self._maintain_timer.timeout.connect(lambda: self.jobs.submit(model_manager.maintain))
+        self._maintain_timer.start(MAINTAIN_INTERVAL_MS)
+
+    def closeEvent(self, event):
+        # Drop in-flight work so nothing calls back into destroyed widgets
+        self.jobs.cancel_all()
+        self._dispatch_timer.stop()
+        self._render_timer.stop()
+        self._maintain_timer.stop()
+        memory.stop()
+        close_store()
+        super().closeEvent(event)
 
     def update_model_status(self):
-        ok = check_model_availability()
-        if ok:
-            self.status_label.setText(f'Model available')
+        self.jobs.submit(check_model_availability, callback=self._on_model_status)
+
+    def _on_model_status(self, ok):
+        if ok is True:
+            # Load the model now so the first message does not wait for it
+            self._model_status = 'Loading model...'
+            self.jobs.submit(model_manager.warm, callback=self._on_model_warm)
         else:
-            self.status_label.setText(f'Model not available — pull and run ollama serve')
+            self._model_status = 'Model not available — pull and run ollama serve'
+        self.status_label.setText(self._model_status)
+
+    def _on_model_warm(self, ok):
+        self._model_status = 'Model ready' if ok is True else 'Model available'
+        if self.status_label.text() == 'Loading model...':
+            self.status_label.setText(self._model_status)
+
+    def _restore_status(self):
+        self.status_label.setText(getattr(self, '_model_status', ''))
 
     def _build_chat_tab(self):
         chat_tab = QWidget()
@@ -68,7 +103,13 @@ class FrancisGUI(QWidget):
 
         self.conversation = QTextEdit()
         self.conversation.setReadOnly(True)
+        # Qt drops the oldest paragraphs itself once the cap is reached
+        self.conversation.document().setMaximumBlockCount(MAX_VISIBLE * 4)
         v.addWidget(self.conversation)
+        self.chat = ChatModel()
+        self._streaming_id = None
+        # msg_id -> cursor at the end of that open message, like the per-message tags in the Tk view
+        self._cursors = {}
 
         h = QHBoxLayout()
         self.input_line = QLineEdit()
@@ -116,27 +157,82 @@ class FrancisGUI(QWidget):
 
         self.tabs.addTab(dev_tab, 'Devices')
 
-    def append_conversation(self, text: str):
-        self.conversation.append(text)
+    def append_conversation(self, text: str, role: str = 'system'):
+        self.chat.add(role, text)
+
+    def _render_chat(self):
+        """Apply pending chat changes in one document edit per frame."""
+        ops = self.chat.take_ops()
+        if not ops:
+            return
+        if any(op[0] == 'clear' for op in ops):
+            self.conversation.clear()
+            self._cursors.clear()
+            ops = ops[max(i for i, op in enumerate(ops) if op[0] == 'clear') + 1:]
+        document = self.conversation.document()
+        block = QTextCursor(document)
+        block.beginEditBlock()
+        for op in ops:
+            kind, msg_id = op[0], op[1]
+            cursor = QTextCursor(document)
+            if kind == 'add':
+                cursor.movePosition(QTextCursor.End)
+                cursor.insertText(op[2])
+                mark = QTextCursor(document)
+                mark.setPosition(cursor.position())
+                # Text added at this spot by later messages must not carry the mark along
+                mark.setKeepPositionOnInsert(True)
+                self._cursors[msg_id] = mark
+                continue
+            mark = self._cursors.get(msg_id)
+            if mark is None:
+                continue
+            # Insert at the end of the message itself; later messages may follow it
+            cursor.setPosition(mark.position())
+            cursor.insertText(op[2] if kind == 'append' else '\n')
+            if kind == 'end':
+                del self._cursors[msg_id]
+            else:
+                mark.setPosition(cursor.position())
+        block.endEditBlock()
+        bar = self.conversation.verticalScrollBar()
+        bar.setValue(bar.maximum())
 
     def on_send(self):
         prompt = self.input_line.text().strip()
         if not prompt:
             return
-        self.append_conversation(f'You: {prompt}')
         self.input_line.clear()
-
-        context = get_project_context(prompt)
-        self.append_conversation('Thinking...')
-
-        worker = Worker(generate_response, prompt, context)
-        worker.finished.connect(lambda out: self._on_response(out, worker))
-        worker.start()
-
-    def _on_response(self, out: str, worker: Worker):
-        # Remove the 'Thinking...' line and append the actual response
-        self.append_conversation(f'F.R.A.N.C.I.S: {out}')
-        worker.deleteLater()
+        if self._streaming_id is not None:
+            # The new request replaces the one still streaming
+            self.chat.finish(self._streaming_id, suffix=' [cancelled]')
+        self.chat.add('user', prompt)
+        msg_id = self._streaming_id = self.chat.add('assistant', done=False)
+
+        # Context retrieval and generation both run off the UI thread; tokens stream into the chat model
+        self.jobs.submit(self._answer, prompt, self.jobs.to_ui(self.status_label.setText),
+                         lambda token: self.chat.append(msg_id, token),
+                         callback=lambda out: self._on_response(msg_id, out), key='chat',
+                         with_token=True, timeout=REQUEST_TIMEOUT)
+
+    def _answer(self, prompt, progress, on_token=None, token=None):
+        """Run ``answer`` and record the finished turn in the conversation store.
+
+        Submitted with ``with_token`` so that replacing or cancelling the job
+        (or closing the window) stops the generation upstream as well.
+        """
+        started = time.perf_counter()
+        context_files = []
+        reply = answer(prompt, progress, on_token, on_context=context_files.extend, token=token)
+        if token is None or not token.cancel_requested:
+            record_turn(self.session_id, prompt, reply, started, context_files, 'qt')
+        return reply
+
+    def _on_response(self, msg_id: int, out: str):
+        self.chat.finish(msg_id, text=out)
+        if self._streaming_id == msg_id:
+            self._streaming_id = None
+        self._restore_status()
 
     def select_audio(self):
         fn, _ = QFileDialog.getOpenFileName(self, 'Select audio file', '', 'Audio Files (*.wav *.mp3 *.flac)')
@@ -148,55 +244,39 @@ class FrancisGUI(QWidget):
         if not self.selected_audio:
             self.voice_resp.setPlainText('No audio file selected')
             return
-        try:
-            import speech_recognition as sr
-        except Exception:
-            self.voice_resp.setPlainText("Speech recognition not available. Install 'speechrecognition' to enable voice.")
-            return
-
-        def transcribe_and_send(path):
-            r = sr.Recognizer()
-            with sr.AudioFile(path) as source:
-                audio = r.record(source)
-            text = r.recognize_google(audio)
-            return text
-
         self.voice_resp.setPlainText('Transcribing...')
-        worker = Worker(transcribe_and_send, self.selected_audio)
-        worker.finished.connect(lambda out: self._on_transcribed(out, worker))
-        worker.start()
+        self.jobs.submit(stt.transcribe, self.selected_audio, callback=self._on_transcribed, key='voice')
 
-    def _on_transcribed(self, text: str, worker: Worker):
+    def _on_transcribed(self, text: str):
+        text = text.strip()
+        if not text or text.startswith('Error:'):
+            # Nothing to ask the model: show why instead of sending an empty or error prompt
+            self.voice_resp.append(text or 'No speech detected.')
+            return
         self.voice_resp.append(f'Transcript: {text}')
-        context = get_project_context(text)
-        w2 = Worker(generate_response, text, context)
-        w2.finished.connect(lambda out: self.voice_resp.append(f'F.R.A.N.C.I.S: {out}'))
-        w2.start()
-        worker.deleteLater()
+        self.jobs.submit(self._answer, text, self.jobs.to_ui(self.status_label.setText), None,
+                         callback=self._on_voice_response, key='voice', with_token=True, timeout=REQUEST_TIMEOUT)
+
+    def _on_voice_response(self, out: str):
+        self.voice_resp.append(f'F.R.A.N.C.I.S: {out}')
+        self._restore_status()
 
     def on_discover(self):
         self.devices_list.clear()
         self.devices_list.addItem('Discovering...')
-        worker = Worker(discover_devices)
-        worker.finished.connect(lambda out: self._on_devices(out, worker))
-        worker.start()
+        self.jobs.submit(discover_devices, callback=self._on_devices, key='devices')
 
-    def _on_devices(self, out: str, worker: Worker):
+    def _on_devices(self, out):
         self.devices_list.clear()
-        try:
-            import ast
-            devices = ast.literal_eval(out) if out.startswith('[') or out.startswith('{') else None
-        except Exception:
-            devices = None
-        if devices and isinstance(devices, list):
+        devices = out if isinstance(out, list) else None
+        if devices:
             for d in devices:
                 addr = d.get('address', 'unknown')
                 resp = d.get('response', '')
                 self.devices_list.addItem(f"{addr} — {resp.splitlines()[0] if resp else ''}")
         else:
             # fallback: show raw
-            self.devices_list.addItem(out)
-        worker.deleteLater()
+            self.devices_list.addItem(str(out))
 
 
 def main():
@@ -1,9 +1,10 @@
-import threading
-import time
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import tkinter.font as tkfont
 import sys
+import time
+import uuid
 
 # Theme override populated by splash (optional)
 THEME = {}
@@ -49,82 +50,54 @@ class Tooltip:
             self.tipwindow = None
 
 
+_icons = {}
+
+
 def _make_icon(name: str, size: int = 20, fg: str = '#E0E0E0', bg: str = None):
-    """Create a simple monochrome icon using Pillow and return an ImageTk.PhotoImage.
+    """Return a tk.PhotoImage of a simple monochrome icon.
     Supported names: 'chat','mic','plug','trash','save','copy'.
-    This keeps icons crisp and consistent across platforms.
+    Icons are rendered once and cached as PNG (see assets.icon_file), so this
+    only needs Pillow the first time an icon is drawn.
     """
-    try:
-        from PIL import Image, ImageDraw
-        from PIL import ImageTk
-    except Exception:
-        return None
-
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    stroke = max(1, size // 10)
-    fg_rgb = tuple(int(fg.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-
-    if name == 'chat':
-        # rounded rect bubble
-        draw.rounded_rectangle([(2, 3), (size-3, size-6)], radius=4, outline=fg_rgb, width=stroke)
-        # tail
-        draw.polygon([(size//3, size-6), (size//3 + 4, size-2), (size//3 + 10, size-6)], fill=fg_rgb)
-    elif name == 'mic':
-        # mic head
-        draw.ellipse([(size*0.28, size*0.12), (size*0.72, size*0.6)], outline=fg_rgb, width=stroke)
-        # handle
-        draw.rectangle([(size*0.45, size*0.58), (size*0.55, size*0.82)], fill=fg_rgb)
-    elif name == 'plug':
-        # body
-        draw.rectangle([(size*0.42, size*0.18), (size*0.58, size*0.6)], fill=fg_rgb)
-        # prongs
-        draw.rectangle([(size*0.36, size*0.12), (size*0.42, size*0.22)], fill=fg_rgb)
-        draw.rectangle([(size*0.58, size*0.12), (size*0.64, size*0.22)], fill=fg_rgb)
-    elif name == 'trash':
-        # lid
-        draw.rectangle([(size*0.22, size*0.18), (size*0.78, size*0.3)], fill=fg_rgb)
-        # body
-        draw.rectangle([(size*0.28, size*0.3), (size*0.72, size*0.78)], outline=fg_rgb, width=stroke)
-    elif name == 'save':
-        # simple floppy
-        draw.rectangle([(size*0.18, size*0.18), (size*0.78, size*0.78)], outline=fg_rgb, width=stroke)
-        draw.rectangle([(size*0.32, size*0.28), (size*0.62, size*0.46)], fill=fg_rgb)
-    elif name == 'copy':
-        draw.rectangle([(size*0.28, size*0.22), (size*0.78, size*0.72)], outline=fg_rgb, width=stroke)
-        draw.rectangle([(size*0.18, size*0.32), (size*0.68, size*0.82)], outline=fg_rgb, width=stroke)
-    else:
-        # fallback: circle
-        draw.ellipse([(3, 3), (size-3, size-3)], outline=fg_rgb, width=stroke)
-
-    return ImageTk.PhotoImage(img)
+    key = (name, size, fg)
+    if key not in _icons:
+        path = assets.icon_file(name, size=size, fg=fg)
+        try:
+            _icons[key] = tk.PhotoImage(file=path) if path else None
+        except tk.TclError:
+            _icons[key] = None
+    return _icons[key]
 
 try:
     # local imports
-    from engine import generate_response, get_project_context, check_model_availability
+    from engine import MODEL_NAME, REQUEST_TIMEOUT, answer, check_model_availability, model_manager, prefetch_context
+    from prefetch import PREFETCH_DEBOUNCE_MS
     from devices import discover_devices
+    import memory
+    import stt
+    from workers import get_service
+    from chatview import ChatModel, FLUSH_INTERVAL_MS, MAX_VISIBLE
+    from store import get_store, record_turn, shutdown as close_store
+    import assets
 except Exception:
-    from src.engine import generate_response, get_project_context, check_model_availability
+    from src.engine import MODEL_NAME, REQUEST_TIMEOUT, answer, check_model_availability, model_manager, prefetch_context
+    from src.prefetch import PREFETCH_DEBOUNCE_MS
     from src.devices import discover_devices
-
-
-class TkWorker(threading.Thread):
-    def __init__(self, fn, args=(), callback=None):
-        super().__init__(daemon=True)
-        self.fn = fn
-        self.args = args
-        self.callback = callback
-
-    def run(self):
-        try:
-            result = self.fn(*self.args)
-        except Exception as e:
-            result = f"Error: {e}"
-        if self.callback:
-            try:
-                self.callback(result)
-            except Exception:
-                pass
+    from src import memory, stt
+    from src.workers import get_service
+    from src.chatview import ChatModel, FLUSH_INTERVAL_MS, MAX_VISIBLE
+    from src.store import get_store, record_turn, shutdown as close_store
+    from src import assets
+
+# How often the UI thread drains results posted by background jobs
+DISPATCH_INTERVAL_MS = 16
+# The splash overlays the already-running main window and never delays it
+SPLASH_LINGER_MS = 400
+SPLASH_MAX_MS = 5000
+# How often the model is re-warmed while the window is open
+MAINTAIN_INTERVAL_MS = 240000
+# Turns of the previous conversation shown at startup; older ones stay in the store
+RESTORE_TURNS = 20
 
 
 class FrancisApp(tk.Tk):
@@ -132,6 +105,7 @@ class FrancisApp(tk.Tk):
         super().__init__()
         self.title('F.R.A.N.C.I.S')
         self.geometry('800x600')
+        self._splash = None
 
         # Modern dark theme with softer grays
         self._bg = THEME.get('bg', '#1E1E1E')  # Dark gray background
@@ -252,16 +226,11 @@ class FrancisApp(tk.Tk):
         self.sidebar_bottom = tk.Frame(self.sidebar, bg=self._bg_darker)
         self.sidebar_bottom.pack(side='bottom', fill='x', padx=8, pady=12)
         try:
-            # Try to load and scale logo for sidebar
-            logo_path = r"C:\Users\ayden\Downloads\62A51B93-2B4B-417F-95B7-F14B733F978C.PNG"
-            from PIL import Image, ImageTk
-            pil_img = Image.open(logo_path)
-            max_w = 200
-            w, h = pil_img.size
-            ratio = max_w / w
-            scaled_h = int(h * ratio)
-            pil_img = pil_img.resize((max_w, scaled_h), Image.LANCZOS)
-            img = ImageTk.PhotoImage(pil_img)
+            # Load the logo scaled for the sidebar (cached on disk after the first run)
+            logo_path = assets.logo_file(200)
+            if not logo_path:
+                raise FileNotFoundError(assets.LOGO_PATH)
+            img = tk.PhotoImage(file=logo_path)
             self.logo_label = tk.Label(self.sidebar_bottom, image=img, bg=self._bg_darker)
             self.logo_label.image = img
             self.logo_label.pack()
@@ -290,12 +259,98 @@ class FrancisApp(tk.Tk):
         # Show default frame
         self._show_frame('chat')
 
-        # Update model status in background
-        threading.Thread(target=self._update_model_status, daemon=True).start()
+        # Background jobs run on the shared pool; their results come back through one dispatch queue
+        self.jobs = get_service()
+        self.protocol('WM_DELETE_WINDOW', self._on_close)
+        self._pump()
+        self._render_chat()
 
-    def _update_model_status(self):
-        ok = check_model_availability()
-        self.status_var.set('Model available' if ok else 'Model not available — run ollama serve and pull qwen3:8b')
+        # Update model status in background
+        self.jobs.submit(check_model_availability, callback=self._on_model_status)
+        # Bring back the end of the last conversation without reading the whole store
+        self.session_id = uuid.uuid4().hex
+        self.jobs.submit(self._load_last_session, callback=self._on_history_loaded)
+        self.jobs.submit(memory.start)
+        self._maintain_id = self.after(MAINTAIN_INTERVAL_MS, self._maintain_model)
+
+    def _maintain_model(self):
+        self.jobs.submit(model_manager.maintain)
+        self._maintain_id = self.after(MAINTAIN_INTERVAL_MS, self._maintain_model)
+
+    def _pump(self):
+        self.jobs.dispatcher.drain()
+        self._pump_id = self.after(DISPATCH_INTERVAL_MS, self._pump)
+
+    def _on_close(self):
+        # Drop in-flight work so nothing calls back into destroyed widgets
+        self.jobs.cancel_all()
+        self.after_cancel(self._pump_id)
+        self.after_cancel(self._render_id)
+        self.after_cancel(self._maintain_id)
+        if self._prefetch_id is not None:
+            self.after_cancel(self._prefetch_id)
+        self.destroy()
+        memory.stop()
+        close_store()
+
+    def _on_model_status(self, ok):
+        if ok is not True:
+            self._model_status = f'Model not available — run ollama serve and pull {MODEL_NAME}'
+            self.status_var.set(self._model_status)
+            if self._splash is not None:
+                self._splash_status.set('Model not available')
+                self.after(SPLASH_LINGER_MS, self._close_splash)
+            return
+        # Load the model now so the first message does not wait for it
+        self._model_status = 'Loading model...'
+        self.status_var.set(self._model_status)
+        if self._splash is not None:
+            self._splash_status.set('Loading model...')
+        self.jobs.submit(model_manager.warm, callback=self._on_model_warm)
+
+    def _on_model_warm(self, ok):
+        self._model_status = 'Model ready' if ok is True else 'Model available'
+        if self.status_var.get() == 'Loading model...':
+            self.status_var.set(self._model_status)
+        if self._splash is not None:
+            self._splash_status.set(self._model_status)
+            self.after(SPLASH_LINGER_MS, self._close_splash)
+
+    @staticmethod
+    def _load_last_session():
+        store = get_store()
+        if store is None:
+            return None
+        last = store.sessions(limit=1, source='tk')
+        if not last:
+            return None
+        session = last[0]['session']
+        return session, store.history(session, limit=RESTORE_TURNS)
+
+    def _on_history_loaded(self, result):
+        # Skip if loading failed or the user already started chatting
+        if not isinstance(result, tuple) or self.chat.transcript().strip():
+            return
+        self.session_id, turns = result
+        for turn in reversed(turns):
+            self.chat.add('user', turn['prompt'])
+            self.chat.add('assistant', turn['response'])
+
+    def _answer(self, prompt, progress, on_token=None, token=None):
+        """Run ``answer`` and record the finished turn in the conversation store.
+
+        Submitted with ``with_token`` so that replacing or cancelling the job
+        (or closing the window) stops the generation upstream as well.
+        """
+        started = time.perf_counter()
+        context_files = []
+        reply = answer(prompt, progress, on_token, on_context=context_files.extend, token=token)
+        if token is None or not token.cancel_requested:
+            record_turn(self.session_id, prompt, reply, started, context_files, 'tk')
+        return reply
+
+    def _restore_status(self):
+        self.status_var.set(getattr(self, '_model_status', ''))
 
     def _show_frame(self, name):
         # Hide all frames
@@ -327,6 +382,9 @@ class FrancisApp(tk.Tk):
             selectforeground=self._fg
         )
         self.chat_text.pack(side='top', expand=1, fill='both', padx=16, pady=16)
+        self.chat = ChatModel()
+        self._visible = deque()  # ids of messages currently rendered in chat_text
+        self._streaming_id = None
 
         # Bottom controls with modern styling (use lighter bg so there's no dark strip)
         bottom = tk.Frame(frame, bg=self._bg_lighter)
@@ -341,6 +399,9 @@ class FrancisApp(tk.Tk):
         input_container.pack(side='left', expand=1, fill='x', padx=(8, 4), pady=4)
 
         self.input_var = tk.StringVar()
+        # Retrieve context speculatively once typing pauses
+        self._prefetch_id = None
+        self.input_var.trace_add('write', self._on_input_changed)
         entry = tk.Entry(
             input_container,
             textvariable=self.input_var,
@@ -448,19 +509,46 @@ class FrancisApp(tk.Tk):
         self.devices_list = tk.Listbox(frame)
         self.devices_list.pack(expand=1, fill='both', padx=8, pady=6)
 
-    def append_chat(self, text: str):
-        self.chat_text.configure(state='normal')
-        self.chat_text.insert('end', text + '\n')
-        self.chat_text.configure(state='disabled')
-        self.chat_text.see('end')
+    def append_chat(self, text: str, role: str = 'system'):
+        self.chat.add(role, text)
+
+    def _render_chat(self):
+        """Apply pending chat changes in one widget update per frame."""
+        ops = self.chat.take_ops()
+        if ops:
+            t = self.chat_text
+            t.configure(state='normal')
+            for op in ops:
+                kind, tag = op[0], f'm{op[1]}'
+                if kind == 'clear':
+                    t.delete('1.0', 'end')
+                    for old in self._visible:
+                        t.tag_delete(f'm{old}')
+                    self._visible.clear()
+                elif kind == 'add':
+                    t.insert('end', op[2], tag)
+                    self._visible.append(op[1])
+                elif tag in t.tag_names():
+                    # Insert at the end of the message itself; later messages may follow it
+                    t.insert(f'{tag}.last', op[2] if kind == 'append' else '\n', tag)
+                elif kind == 'end':
+                    t.insert('end', '\n', tag)
+            # Keep only the most recent messages in the widget
+            while len(self._visible) > MAX_VISIBLE:
+                tag = f'm{self._visible.popleft()}'
+                ranges = t.tag_ranges(tag)
+                if ranges:
+                    t.delete('1.0', ranges[-1])
+                t.tag_delete(tag)
+            t.configure(state='disabled')
+            t.see('end')
+        self._render_id = self.after(FLUSH_INTERVAL_MS, self._render_chat)
 
     def clear_conversation(self):
-        self.chat_text.configure(state='normal')
-        self.chat_text.delete('1.0', 'end')
-        self.chat_text.configure(state='disabled')
+        self.chat.clear()
 
     def save_conversation(self):
-        content = self.chat_text.get('1.0', 'end').strip()
+        content = self.chat.transcript().strip()
         if not content:
             messagebox.showinfo('Save', 'Nothing to save')
             return
@@ -474,33 +562,51 @@ class FrancisApp(tk.Tk):
                 messagebox.showerror('Error', str(e))
 
     def copy_last_response(self):
-        text = self.chat_text.get('1.0', 'end').strip().splitlines()
-        for line in reversed(text):
-            if line.startswith('F.R.A.N.C.I.S:'):
-                resp = line[len('F.R.A.N.C.I.S:'):].strip()
-                try:
-                    self.clipboard_clear()
-                    self.clipboard_append(resp)
-                    messagebox.showinfo('Copied', 'Last response copied to clipboard')
-                except Exception as e:
-                    messagebox.showerror('Error', str(e))
-                return
-        messagebox.showinfo('Copy', 'No response found to copy')
+        resp = self.chat.last_response.strip()
+        if not resp:
+            messagebox.showinfo('Copy', 'No response found to copy')
+            return
+        try:
+            self.clipboard_clear()
+            self.clipboard_append(resp)
+            messagebox.showinfo('Copied', 'Last response copied to clipboard')
+        except Exception as e:
+            messagebox.showerror('Error', str(e))
+
+    def _on_input_changed(self, *_args):
+        if self._prefetch_id is not None:
+            self.after_cancel(self._prefetch_id)
+        self._prefetch_id = self.after(PREFETCH_DEBOUNCE_MS, self._prefetch)
+
+    def _prefetch(self):
+        self._prefetch_id = None
+        text = self.input_var.get().strip()
+        if text:
+            # The 'prefetch' key cancels a scan still running for an older prefix
+            self.jobs.submit(prefetch_context, text, key='prefetch', with_token=True)
+            model_manager.warm_async([MODEL_NAME])
 
     def on_send(self):
         prompt = self.input_var.get().strip()
         if not prompt:
             return
-        self.append_chat(f'You: {prompt}')
         self.input_var.set('')
-        self.append_chat('Thinking...')
-        ctx = get_project_context(prompt)
-        worker = TkWorker(generate_response, args=(prompt, ctx), callback=lambda out: self.after(0, self._on_response, out))
-        worker.start()
-
-    def _on_response(self, out):
-        # Remove 'Thinking...' — simple approach: just append response
-        self.append_chat(f'F.R.A.N.C.I.S: {out}')
+        if self._streaming_id is not None:
+            # The new request replaces the one still streaming
+            self.chat.finish(self._streaming_id, suffix=' [cancelled]')
+        self.chat.add('user', prompt)
+        msg_id = self._streaming_id = self.chat.add('assistant', done=False)
+        # Context retrieval and generation both run off the UI thread; tokens stream into the chat model
+        self.jobs.submit(self._answer, prompt, self.jobs.to_ui(self.status_var.set),
+                         lambda token: self.chat.append(msg_id, token),
+                         callback=lambda out: self._on_response(msg_id, out), key='chat',
+                         with_token=True, timeout=REQUEST_TIMEOUT)
+
+    def _on_response(self, msg_id, out):
+        self.chat.finish(msg_id, text=out)
+        if self._streaming_id == msg_id:
+            self._streaming_id = None
+        self._restore_status()
 
     def select_audio(self):
         fn = filedialog.askopenfilename(title='Select audio file', filetypes=[('Audio', '*.wav *.mp3 *.flac')])
@@ -512,40 +618,38 @@ class FrancisApp(tk.Tk):
         if not self.selected_audio:
             messagebox.showinfo('No file', 'Please select an audio file first')
             return
-        try:
-            import speech_recognition as sr
-        except Exception:
-            messagebox.showwarning('Missing dependency', "Install 'speechrecognition' to enable audio transcription")
-            return
-
-        def transcribe(path):
-            r = sr.Recognizer()
-            with sr.AudioFile(path) as source:
-                audio = r.record(source)
-            text = r.recognize_google(audio)
-            return text
-
         self.voice_resp.configure(state='normal')
         self.voice_resp.delete('1.0', 'end')
         self.voice_resp.insert('end', 'Transcribing...')
         self.voice_resp.configure(state='disabled')
 
-        worker = TkWorker(transcribe, args=(self.selected_audio,), callback=lambda out: self.after(0, self._on_transcribed, out))
-        worker.start()
+        self.jobs.submit(stt.transcribe, self.selected_audio, callback=self._on_transcribed, key='voice')
 
     def _on_transcribed(self, text):
+        text = text.strip()
+        failed = not text or text.startswith('Error:')
         self.voice_resp.configure(state='normal')
-        self.voice_resp.insert('end', f'\nTranscript: {text}\n')
+        if failed:
+            # Nothing to ask the model: show why instead of sending an empty or error prompt
+            self.voice_resp.insert('end', f"\n{text or 'No speech detected.'}\n")
+        else:
+            self.voice_resp.insert('end', f'\nTranscript: {text}\n')
         self.voice_resp.configure(state='disabled')
-        ctx = get_project_context(text)
-        worker = TkWorker(generate_response, args=(text, ctx), callback=lambda out: self.after(0, lambda: self.voice_resp.configure(state='normal') or self.voice_resp.insert('end', f'\nF.R.A.N.C.I.S: {out}\n') or self.voice_resp.configure(state='disabled')))
-        worker.start()
+        if failed:
+            return
+        self.jobs.submit(self._answer, text, self.jobs.to_ui(self.status_var.set), None, callback=self._on_voice_response,
+                         key='voice', with_token=True, timeout=REQUEST_TIMEOUT)
+
+    def _on_voice_response(self, out):
+        self.voice_resp.configure(state='normal')
+        self.voice_resp.insert('end', f'\nF.R.A.N.C.I.S: {out}\n')
+        self.voice_resp.configure(state='disabled')
+        self._restore_status()
 
     def on_discover(self):
         self.devices_list.delete(0, 'end')
         self.devices_list.insert('end', 'Discovering...')
-        worker = TkWorker(discover_devices, callback=lambda out: self.after(0, self._on_devices, out))
-        worker.start()
+        self.jobs.submit(discover_devices, callback=self._on_devices, key='devices')
 
     def _on_devices(self, out):
         self.devices_list.delete(0, 'end')
@@ -563,104 +667,64 @@ class FrancisApp(tk.Tk):
             self.devices_list.insert('end', str(devices))
 
 
-def main():
-    # Modern splash screen
-    splash_bg = '#1E1E1E'  # Match main window dark gray
-    splash_fg = '#E0E0E0'  # Match main window text color
-    splash = tk.Tk()
-    splash.overrideredirect(True)
-    splash.configure(bg=splash_bg)
-    w, h = 480, 280  # Slightly larger for better proportions
-    ws = splash.winfo_screenwidth()
-    hs = splash.winfo_screenheight()
-    x = (ws - w) // 2
-    y = (hs - h) // 2
-    splash.geometry(f"{w}x{h}+{x}+{y}")
-    
-    # Add a subtle border
-    splash_frame = tk.Frame(splash, bg='#2D2D2D', bd=1)
-    splash_frame.place(relx=0, rely=0, relwidth=1, relheight=1)
-    
-    inner_frame = tk.Frame(splash_frame, bg=splash_bg)
-    inner_frame.place(relx=0.01, rely=0.01, relwidth=0.98, relheight=0.98)
-
-    lbl = tk.Label(splash, text='Rebhan Industries', font=('Segoe UI', 20, 'bold'), bg=splash_bg, fg=splash_fg)
-    lbl.pack(expand=True)
-    # Try to load provided logo (PNG). Fall back to text placeholder on failure.
-    logo_path = r"C:\Users\ayden\Downloads\62A51B93-2B4B-417F-95B7-F14B733F978C.PNG"
-    # Prefer Pillow for robust PNG loading + resizing; fall back to PhotoImage if Pillow not available
-    try:
-        from PIL import Image, ImageTk
-        try:
-            pil_img = Image.open(logo_path)
-            # Resize to fit within splash while preserving aspect ratio
-            max_w, max_h = 360, 110
-            pil_img.thumbnail((max_w, max_h), Image.LANCZOS)
-            img = ImageTk.PhotoImage(pil_img)
-            logo = tk.Label(splash, image=img, bg=splash_bg)
-            logo.image = img
-            logo.pack()
-
-            # Derive a simple accent color from the image (average color)
-            small = pil_img.convert('RGBA').resize((20, 20))
-            pixels = list(small.getdata())
-            r = sum(p[0] for p in pixels) / len(pixels)
-            g = sum(p[1] for p in pixels) / len(pixels)
-            b = sum(p[2] for p in pixels) / len(pixels)
-            accent_hex = '#%02x%02x%02x' % (int(r), int(g), int(b))
-            # store derived theme for the main app to consume
-            THEME['accent'] = accent_hex
-            # choose contrasting fg/bg
-            luminance = (0.2126*r + 0.7152*g + 0.0722*b)
-            if luminance < 128:
-                # Avoid pure black; choose a very dark gray instead
-                THEME['bg'] = '#0f0f0f'
-                THEME['fg'] = '#FFFFFF'
-            else:
-                THEME['bg'] = '#FFFFFF'
-                THEME['fg'] = '#111111'
-        except Exception:
-            raise
-    except Exception:
+    def show_splash(self):
+        """Show the splash as an overlay; it closes itself once the model is loaded (or after SPLASH_MAX_MS)."""
+        splash_bg = '#1E1E1E'  # Match main window dark gray
+        splash_fg = '#E0E0E0'  # Match main window text color
+        splash = tk.Toplevel(self)
+        splash.overrideredirect(True)
+        splash.configure(bg=splash_bg)
+        w, h = 480, 280  # Slightly larger for better proportions
+        ws = splash.winfo_screenwidth()
+        hs = splash.winfo_screenheight()
+        x = (ws - w) // 2
+        y = (hs - h) // 2
+        splash.geometry(f"{w}x{h}+{x}+{y}")
+
+        # Add a subtle border
+        splash_frame = tk.Frame(splash, bg='#2D2D2D', bd=1)
+        splash_frame.place(relx=0, rely=0, relwidth=1, relheight=1)
+
+        inner_frame = tk.Frame(splash_frame, bg=splash_bg)
+        inner_frame.place(relx=0.01, rely=0.01, relwidth=0.98, relheight=0.98)
+
+        lbl = tk.Label(splash, text='Rebhan Industries', font=('Segoe UI', 20, 'bold'), bg=splash_bg, fg=splash_fg)
+        lbl.pack(expand=True)
+        # Logo scaled to fit within the splash (cached PNG); fall back to a text placeholder
         try:
+            logo_path = assets.logo_file(360, 110)
+            if not logo_path:
+                raise FileNotFoundError(assets.LOGO_PATH)
             img = tk.PhotoImage(file=logo_path)
             logo = tk.Label(splash, image=img, bg=splash_bg)
             logo.image = img
-            logo.pack()
         except Exception:
             logo = tk.Label(splash, text='[ Logo / Company ]', bg=splash_bg, fg=splash_fg)
-            logo.pack()
-    splash_status_var = tk.StringVar(value='Checking model...')
-    splash_status = tk.Label(splash, textvariable=splash_status_var, bg=splash_bg, fg=splash_fg)
-    splash_status.pack()
-    pb = ttk.Progressbar(splash, mode='indeterminate', length=300)
-    pb.pack(pady=10)
-    pb.start(10)
-
-    def _check():
-        try:
-            ok = check_model_availability()
-        except Exception:
-            ok = False
-        # update status text on the main thread
-        try:
-            splash.after(0, lambda: splash_status_var.set('Model available' if ok else 'Model not available'))
-        except Exception:
-            pass
-        # give user a short moment to read status
-        time.sleep(0.8)
-        try:
-            # stop progressbar before destroying to avoid tk internals trying to access widgets after destroy
-            splash.after(0, lambda: pb.stop())
-            splash.after(0, splash.destroy)
-        except Exception:
-            pass
+        logo.pack()
+        self._splash_status = tk.StringVar(value='Checking model...')
+        splash_status = tk.Label(splash, textvariable=self._splash_status, bg=splash_bg, fg=splash_fg)
+        splash_status.pack()
+        self._splash_pb = ttk.Progressbar(splash, mode='indeterminate', length=300)
+        self._splash_pb.pack(pady=10)
+        self._splash_pb.start(10)
+        splash.lift()
+        self._splash = splash
+        self.after(SPLASH_MAX_MS, self._close_splash)
+
+    def _close_splash(self):
+        if self._splash is None:
+            return
+        # stop progressbar before destroying to avoid tk internals trying to access widgets after destroy
+        self._splash_pb.stop()
+        self._splash.destroy()
+        self._splash = None
 
-    threading.Thread(target=_check, daemon=True).start()
-    splash.mainloop()
 
-    # Start main app
+def main():
+    # Theme comes from the on-disk cache; Pillow is only needed the first time a logo is seen
+    THEME.update(assets.load_theme())
     app = FrancisApp()
+    app.show_splash()
     app.mainloop()
 
 
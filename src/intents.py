@@ -0,0 +1,228 @@
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+try:
+    from devices import discover_devices
+except ImportError:
+    from src.devices import discover_devices
+
+# Inputs longer than this are treated as open-ended and go to the model
+MAX_COMMAND_WORDS = 8
+# Minimum token overlap with an example phrase for the fallback classifier
+MIN_OVERLAP = 0.75
+# Reuse a recent discovery instead of waiting on SSDP again
+DEVICE_CACHE_SECONDS = 30
+
+FILLER = frozenset('hey hi ok okay please francis can could would you me tell show the a an for to of'.split())
+# A Python name or dotted path ("refresh", "Router.generate"), captured as the rule's argument
+SYMBOL = r'(?P<arg>[a-z_][a-z0-9_]*(?:\.[a-z_][a-z0-9_]*)*)'
+
+
+class Intent:
+    """A command handled without the LLM: regex rules plus example phrases for fuzzy matching.
+
+    Rules are matched against the input after ``words`` drops FILLER words,
+    so they should not mention those words. A rule may capture the command's
+    argument in a group named ``arg`` (see ``argument``).
+    """
+
+    def __init__(self, name: str, handler: Callable[[str], str], rules: Sequence[str], examples: Sequence[str]):
+        self.name = name
+        self.handler = handler
+        self.rules = [re.compile(r, re.I) for r in rules]
+        self.examples = [frozenset(tokens(e)) for e in examples]
+
+    def argument(self, text: str) -> Optional[str]:
+        """The ``arg`` group of the first rule that matches ``text`` and captures one."""
+        normalized = ' '.join(words(text))
+        for rule in self.rules:
+            m = rule.match(normalized)
+            if m is not None and 'arg' in rule.groupindex:
+                return m.group('arg')
+        return None
+
+
+def words(text: str) -> List[str]:
+    """Words of ``text`` without FILLER, keeping case and dotted names such as "main.py"."""
+    return [w for w in re.findall(r"[A-Za-z0-9_']+(?:\.[A-Za-z0-9_]+)*", text) if w.lower() not in FILLER]
+
+
+def tokens(text: str) -> List[str]:
+    return [w.lower() for w in words(text)]
+
+
+_devices_cache = (0.0, None)
+_devices_lock = threading.Lock()
+
+
+def _describe(device: Dict[str, str]) -> str:
+    server = re.search(r'^server:\s*(.+)$', device.get('response', ''), re.I | re.M)
+    return f"{device['address']} ({server.group(1).strip()})" if server else device['address']
+
+
+def refresh_devices() -> List[Dict[str, str]]:
+    """Run discovery now and cache the result (used by the scheduler)."""
+    global _devices_cache
+    devices = discover_devices()
+    with _devices_lock:
+        _devices_cache = (time.monotonic(), devices)
+    return devices
+
+
+def handle_devices(_text: str) -> str:
+    with _devices_lock:
+        found_at, devices = _devices_cache
+    if devices is None or time.monotonic() - found_at > DEVICE_CACHE_SECONDS:
+        devices = refresh_devices()
+    if not devices:
+        return "I didn't find any devices on the network."
+    lines = '\n'.join(f"- {_describe(d)}" for d in devices)
+    return f"Found {len(devices)} device{'s' if len(devices) != 1 else ''}:\n{lines}"
+
+
+def handle_time(_text: str) -> str:
+    return datetime.now().strftime("It's %I:%M %p.").replace("It's 0", "It's ")
+
+
+def handle_date(_text: str) -> str:
+    now = datetime.now()
+    return f"Today is {now:%A, %B} {now.day}, {now.year}."
+
+
+def handle_status(_text: str) -> str:
+    try:
+        from backends import get_router
+    except ImportError:
+        from src.backends import get_router
+    router = get_router()
+    router.check(force=True)
+    up = [b for b in router.backends if b.healthy]
+    model = router.model_for('default')
+    lines = [f"{len(up)} of {len(router.backends)} Ollama host{'s' if len(router.backends) != 1 else ''} reachable."]
+    lines.append(f"Model {model} is {'available' if router.available(model) else 'not available'}.")
+    return ' '.join(lines)
+
+
+def handle_help(_text: str) -> str:
+    return ("I can answer questions about this project and help with code. Quick commands: "
+            "'list devices', 'what time is it', 'what's the date', 'status', 'what files are in this project', "
+            "'where is X defined', 'what calls X', 'outline main.py'. Anything else goes to the language model.")
+
+
+def _structure():
+    try:
+        from engine import structure_index
+        import structure
+    except ImportError:
+        from src.engine import structure_index
+        from src import structure
+    return structure_index, structure
+
+
+def _argument(intent_name: str, text: str) -> Optional[str]:
+    return next(i for i in INTENTS if i.name == intent_name).argument(text)
+
+
+# The structure handlers return None when the text names nothing in the project,
+# so the question falls through to the model instead
+
+def handle_files(_text: str) -> str:
+    index, structure = _structure()
+    return structure.describe_files(index)
+
+
+def handle_definition(text: str) -> Optional[str]:
+    name = _argument('definition', text)
+    if name is None:
+        return None
+    index, structure = _structure()
+    return structure.describe_definitions(index, name)
+
+
+def handle_callers(text: str) -> Optional[str]:
+    name = _argument('callers', text)
+    if name is None:
+        return None
+    index, structure = _structure()
+    return structure.describe_callers(index, name)
+
+
+def handle_outline(text: str) -> Optional[str]:
+    index, structure = _structure()
+    return structure.describe_outline(index, text)
+
+
+INTENTS = [
+    Intent('devices', handle_devices,
+           [r'^((list|find|discover|scan|search|get) )?((my|all|network|smart|home) )*devices?( on( my)? network)?$',
+            r'^(what|which) devices( are)?( on| in)?( my)?( network| home)?$'],
+           ['list devices', 'discover devices', 'scan network devices', 'what devices are on network',
+            'find smart home devices']),
+    Intent('time', handle_time,
+           [r"^(what('s| is)? )?(current )?time( is it)?( now)?$"],
+           ['what time is it', 'current time', 'time now']),
+    Intent('date', handle_date,
+           [r"^(what('s| is)? )?(today's )?(current )?date( today)?( is it)?$",
+            r"^what day is (it|today)$", r"^what('s| is) today$"],
+           ['what is date today', "today's date", 'what day is it']),
+    Intent('status', handle_status,
+           [r'^(system |model |server |backend )?status$', r'^(are|is) (model|ollama|server) (up|running|online)$',
+            r'^check (system |model )?status$'],
+           ['system status', 'is model running', 'check status', 'are you online']),
+    Intent('files', handle_files,
+           [r'^(what|which) files( are| do)?( in| there| we have| have)?( in)?( this| my)?'
+            r'( project| repo| repository| codebase)?$',
+            r'^(list|all)( all)?( project)? files$', r'^(project|file) (tree|structure|layout)$'],
+           ['what files are in this project', 'list files', 'project file tree']),
+    Intent('definition', handle_definition,
+           [r'^where( is| are)? ((function|class|method) )?' + SYMBOL + r'( function| class| method)?'
+            r' (defined|declared|implemented)$',
+            r'^(find|locate|where is|where are) (function|class|method|definition)s? ' + SYMBOL + '$'],
+           ['where is defined', 'find definition']),
+    Intent('callers', handle_callers,
+           [r'^(what|who|which \w+|where) (calls?|uses?) ' + SYMBOL + '$',
+            r'^(callers|usages|uses) ' + SYMBOL + '$',
+            r'^where( is| are)? ' + SYMBOL + ' (called|used)$'],
+           ['what calls', 'find callers']),
+    Intent('outline', handle_outline,
+           [r'^(outline|symbols)( file)? .+\.py$',
+            r'^((list|what|which) )?(functions|classes|symbols|methods)( are)?( in| defined in)? .+\.py$'],
+           ['outline file', 'list functions in file']),
+    Intent('help', handle_help,
+           [r'^help$', r'^what (i )?do$', r'^(list )?commands$'],
+           ['help', 'what can you do', 'list commands']),
+]
+
+
+def classify(text: str) -> Optional[Intent]:
+    """The intent a short command asks for, or None if it should go to the model."""
+    found = words(text)
+    if not found or len(found) > MAX_COMMAND_WORDS:
+        return None
+    normalized = ' '.join(found)
+    for intent in INTENTS:
+        if any(rule.match(normalized) for rule in intent.rules):
+            return intent
+    # Fallback: token overlap with the example phrases
+    query = frozenset(w.lower() for w in found)
+    best, best_score = None, 0.0
+    for intent in INTENTS:
+        for example in intent.examples:
+            score = len(query & example) / len(query | example)
+            if score > best_score:
+                best, best_score = intent, score
+    return best if best_score >= MIN_OVERLAP else None
+
+
+def handle(text: str) -> Optional[str]:
+    """Answer ``text`` directly if it is a known command; None means fall through to the LLM."""
+    intent = classify(text)
+    if intent is None:
+        return None
+    try:
+        return intent.handler(text)
+    except Exception as e:
+        return f"Error: {e}"
@@ -1,15 +1,5 @@
 # Main entry point for F.R.A.N.C.I.S AI Assistant using Ollama Qwen3
-import requests
-import json
-import sys
-import os
-import glob
-from typing import List, Dict
-
-OLLAMA_BASE_URL = "http://localhost:11434/api"
-MODEL_NAME = "qwen3:8b"
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
+# Ollama hosts and models are configured in backends.py
 import sys
 
 
@@ -22,5 +12,18 @@ def _run_gui():
     gui_main()
 
 
+def _run_cli(argv):
+    try:
+        from cli import main as cli_main
+    except Exception:
+        from src.cli import main as cli_main
+    cli_main(argv)
+
+
 if __name__ == "__main__":
-    _run_gui()
+    # `--cli` (or `--batch`) runs headless in the terminal; otherwise launch the GUI
+    args = sys.argv[1:]
+    if '--cli' in args or '--batch' in args:
+        _run_cli([a for a in args if a != '--cli'])
+    else:
+        _run_gui()
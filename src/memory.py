@@ -0,0 +1,323 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from store import DB_PATH, SCHEMA as TURNS_SCHEMA, connect
+except ImportError:
+    from src.store import DB_PATH, SCHEMA as TURNS_SCHEMA, connect
+
+# Rough prompt budget for recalled memories (about four characters per token)
+MEMORY_TOKEN_BUDGET = int(os.environ.get('FRANCIS_MEMORY_TOKENS', '300'))
+MAX_RECALLED = 5
+# Seconds between background summarization passes
+SUMMARIZE_INTERVAL = float(os.environ.get('FRANCIS_MEMORY_INTERVAL', '300'))
+# Turns younger than this are still covered by the conversation history in the prompt
+SUMMARY_AGE = 600
+SUMMARY_BATCH = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    session TEXT,
+    created REAL NOT NULL,
+    last_turn INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS memories_text ON memories(kind, text);
+CREATE TABLE IF NOT EXISTS memory_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+    text, content='memories', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+    INSERT INTO memories_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can could did do does for from had has have how i if in is it its me my
+of on or our please should so than that the their them then there these this to was we were what
+when where which who why will with would you your francis
+""".split())
+
+# Greetings and fillers allowed before a statement ("ok, my name is ...")
+_LEAD = r"^(?:(?:ok|okay|so|also|and|btw|please|hey|hi|francis)[,!]?\s+)*"
+# Statements about the user worth keeping verbatim; only at the start of a sentence
+FACT_PATTERNS = [
+    re.compile(_LEAD + r"remember(?: that|:)\s+(.{3,200})", re.I),
+    re.compile(_LEAD + r"(my (?:name|first name|last name|full name|nickname|birthday|email|e-mail|timezone|"
+                       r"time zone|pronouns|job|role|job title|hometown|city|company|employer|team|"
+                       r"favou?rite \w+) (?:is|are) .{2,120})", re.I),
+    re.compile(_LEAD + r"(i (?:prefer|live in|work (?:at|for|as|on)) .{2,120})", re.I),
+    re.compile(_LEAD + r"(call me .{2,60})", re.I),
+]
+# Sentences that ask something rather than state it
+QUESTION = re.compile(r"\?|^\W*(?:do|does|did|can|could|would|will|should|shall|is|are|was|were|what|how|why|"
+                      r"when|where|who|which)\b", re.I)
+NEGATION = re.compile(r"\b(?:don'?t|do not|doesn'?t|does not|didn'?t|did not|never|not|no longer)\b", re.I)
+
+SUMMARY_PROMPT = (
+    "Summarize what is worth remembering long-term from this conversation between a user and the assistant "
+    "F.R.A.N.C.I.S: the user's preferences, personal details, ongoing projects and decisions. "
+    "Write at most three short sentences in the third person about the user. "
+    "If nothing is worth remembering, answer NONE.\n\n{turns}\n\nSummary:"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def keywords(text: str) -> List[str]:
+    return [w for w in re.findall(r"[a-z0-9']+", text.lower()) if len(w) > 1 and w not in STOPWORDS]
+
+
+def extract_facts(prompt: str) -> List[str]:
+    """Facts the user stated about themselves, rewritten from the assistant's point of view.
+
+    Only statements at the start of a sentence count; questions ("do you
+    remember ...?") and negations ("I don't remember ...") are skipped.
+    """
+    facts = []
+    for sentence in re.split(r'(?<=[.!?])\s+|\n', prompt):
+        sentence = sentence.strip()
+        if not sentence or QUESTION.search(sentence):
+            continue
+        for pattern in FACT_PATTERNS:
+            m = pattern.match(sentence)
+            if m:
+                if NEGATION.search(sentence[:m.start(1)] + m.group(1)[:40]):
+                    break
+                fact = m.group(1).strip().rstrip('.!?')
+                fact = re.sub(r'^my\b', 'Their', fact, flags=re.I)
+                fact = re.sub(r'^i\b', 'They', fact, flags=re.I)
+                fact = re.sub(r'^call me\b', 'They like to be called', fact, flags=re.I)
+                facts.append('The user said: ' + fact if fact[0].islower() else fact)
+                break
+    return facts
+
+
+class MemoryStore:
+    """Long-term memories distilled from the conversation store.
+
+    Facts the user states are copied as soon as a pass sees them; older turns
+    are summarized by the model in batches. Recall ranks memories by keyword
+    relevance and stops at a token budget, so the prompt never grows with the
+    size of the memory.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(TURNS_SCHEMA)
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self._conn.commit()
+
+    def add(self, kind: str, text: str, session: str = None, last_turn: int = None):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR IGNORE INTO memories (kind, text, session, created, last_turn) '
+                               'VALUES (?, ?, ?, ?, ?)', (kind, text, session, time.time(), last_turn))
+
+    def all(self, limit: int = 100) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM memories ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def recall(self, query: str, budget: int = MEMORY_TOKEN_BUDGET, limit: int = MAX_RECALLED) -> List[str]:
+        """The most relevant memories for ``query`` that fit within ``budget`` tokens."""
+        terms = keywords(query)
+        if not terms or budget <= 0:
+            return []
+        with self._lock:
+            if self.has_fts:
+                match = ' OR '.join('"' + t.replace('"', '""') + '"' for t in terms)
+                rows = self._conn.execute(
+                    'SELECT memories.text FROM memories_fts JOIN memories ON memories.id = memories_fts.rowid '
+                    'WHERE memories_fts MATCH ? ORDER BY bm25(memories_fts) LIMIT ?', (match, limit * 4)).fetchall()
+            else:
+                where = ' OR '.join('text LIKE ?' for _ in terms)
+                rows = self._conn.execute(f'SELECT text FROM memories WHERE {where} ORDER BY id DESC LIMIT ?',
+                                          [f'%{t}%' for t in terms] + [limit * 4]).fetchall()
+        chosen, used = [], 0
+        for row in rows:
+            cost = estimate_tokens(row['text'])
+            if used + cost > budget:
+                continue
+            chosen.append(row['text'])
+            used += cost
+            if len(chosen) >= limit:
+                break
+        return chosen
+
+    def _cursor(self, name: str) -> int:
+        row = self._conn.execute('SELECT value FROM memory_state WHERE name = ?', (name,)).fetchone()
+        return row['value'] if row else 0
+
+    def _set_cursor(self, name: str, value: int):
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO memory_state (name, value) VALUES (?, ?)', (name, value))
+
+    def _turns_after(self, cursor: int, before: float = None) -> List[sqlite3.Row]:
+        sql = 'SELECT id, session, prompt, response FROM turns WHERE id > ?'
+        params = [cursor]
+        if before is not None:
+            sql += ' AND created < ?'
+            params.append(before)
+        return self._conn.execute(sql + ' ORDER BY id LIMIT ?', params + [SUMMARY_BATCH]).fetchall()
+
+    def _summarized(self, session: str, last_turn: int) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM memories WHERE kind = 'summary' AND session = ? "
+                                      "AND last_turn >= ?", (session, last_turn)).fetchone() is not None
+
+    def update(self, summarize=None, busy: Callable[[], bool] = None) -> int:
+        """Run one pass over new turns; returns the number of memories added.
+
+        ``summarize(text) -> str`` produces the long-term summary of a batch of
+        turns. Summaries are retried on the next pass if it fails, or if
+        ``busy()`` reports interactive requests before a model call; sessions
+        of the batch that were already summarized are not summarized again.
+        """
+        added = 0
+        with self._lock:
+            cursor = self._cursor('facts')
+            turns = self._turns_after(cursor)
+            while turns:
+                with self._conn:
+                    for turn in turns:
+                        for fact in extract_facts(turn['prompt']):
+                            added += self._conn.execute(
+                                'INSERT OR IGNORE INTO memories (kind, text, session, created, last_turn) '
+                                'VALUES (?, ?, ?, ?, ?)', ('fact', fact, turn['session'], time.time(), turn['id'])
+                            ).rowcount
+                self._set_cursor('facts', turns[-1]['id'])
+                turns = self._turns_after(turns[-1]['id'])
+
+            if summarize is None:
+                return added
+            cursor = self._cursor('summaries')
+            turns = self._turns_after(cursor, before=time.time() - SUMMARY_AGE)
+
+        # The model call happens outside the lock so recall is never blocked by it
+        while turns:
+            by_session: Dict[str, List[sqlite3.Row]] = {}
+            for turn in turns:
+                by_session.setdefault(turn['session'], []).append(turn)
+            for session, group in by_session.items():
+                if self._summarized(session, group[-1]['id']):
+                    continue  # stored by a pass that stopped before moving the cursor
+                if busy is not None and busy():
+                    return added
+                text = '\n'.join(f"User: {t['prompt']}\nF.R.A.N.C.I.S: {t['response']}" for t in group)
+                summary = summarize(SUMMARY_PROMPT.format(turns=text)).strip()
+                if not summary or summary.startswith('Error:'):
+                    return added
+                if summary.upper().rstrip('.') != 'NONE':
+                    self.add('summary', summary, session, group[-1]['id'])
+                    added += 1
+            with self._lock:
+                self._set_cursor('summaries', turns[-1]['id'])
+                turns = self._turns_after(turns[-1]['id'], before=time.time() - SUMMARY_AGE)
+        return added
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryService:
+    """Background thread that folds new conversation turns into memory.
+
+    Like scheduled jobs, it leaves the model alone while chat requests are in
+    flight; summaries it skips are picked up on a later pass.
+    """
+
+    def __init__(self, memory: MemoryStore, interval: float = SUMMARIZE_INTERVAL):
+        self.memory = memory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='francis-memory', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        try:
+            from engine import complete
+            from scheduler import load
+        except ImportError:
+            from src.engine import complete
+            from src.scheduler import load
+        while not self._stop.wait(self.interval):
+            try:
+                self.memory.update(complete, busy=load.busy)
+            except sqlite3.Error:
+                pass
+
+    def stop(self):
+        self._stop.set()
+
+
+_memory = None
+_service = None
+_memory_lock = threading.Lock()
+
+
+def get_memory() -> Optional[MemoryStore]:
+    """Return the shared memory store, or None if the database cannot be opened."""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            try:
+                _memory = MemoryStore()
+            except (OSError, sqlite3.Error):
+                return None
+        return _memory
+
+
+def recall(query: str) -> List[str]:
+    """Relevant memories for a prompt; empty if memory is unavailable."""
+    memory = get_memory()
+    if memory is None:
+        return []
+    try:
+        return memory.recall(query)
+    except sqlite3.Error:
+        return []
+
+
+def start():
+    """Start background summarization (idempotent)."""
+    global _service
+    memory = get_memory()
+    with _memory_lock:
+        if memory is not None and _service is None:
+            _service = MemoryService(memory)
+            _service.start()
+
+
+def stop():
+    global _service
+    with _memory_lock:
+        if _service is not None:
+            _service.stop()
+            _service = None
@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+try:
+    from project_index import IndexedFile, ProjectIndex
+except ImportError:
+    from src.project_index import IndexedFile, ProjectIndex
+
+# Wait this long after the last keystroke before prefetching
+PREFETCH_DEBOUNCE_MS = 250
+# Shorter inputs match almost every file and are not worth caching
+MIN_PREFETCH_CHARS = 3
+CACHE_SIZE = 64
+
+
+class ContextPrefetcher:
+    """Cache of project-index matches keyed by (lowercased) query text.
+
+    Matching is case-insensitive substring search, so every file that
+    contains a query also contains any substring of it. A lookup for
+    "how does the vad" can therefore start from the cached matches for
+    "how does th" and only re-check those files, instead of the whole index.
+    While the user types, each debounced prefix narrows the previous result;
+    by the time they press Send the final query is usually one cheap filter
+    (or a cache hit) away. Entries are dropped when the index changes.
+    """
+
+    def __init__(self, index: ProjectIndex, size: int = CACHE_SIZE):
+        self.index = index
+        self.size = size
+        self._cache: 'OrderedDict[str, List[IndexedFile]]' = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _base(self, needle: str, version: int) -> Tuple[Optional[str], Optional[List[IndexedFile]]]:
+        """The longest cached query contained in ``needle`` and its matches."""
+        with self._lock:
+            if self._version != version:
+                self._cache.clear()
+                self._version = version
+                return None, None
+            best = needle if needle in self._cache else max(
+                (key for key in self._cache if key in needle), key=len, default=None)
+            if best is None:
+                return None, None
+            self._cache.move_to_end(best)
+            return best, self._cache[best]
+
+    def _store(self, needle: str, matches: List[IndexedFile], version: int):
+        with self._lock:
+            if version != self._version:
+                return
+            self._cache[needle] = matches
+            self._cache.move_to_end(needle)
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+
+    def matches(self, query: str, token=None) -> Optional[List[IndexedFile]]:
+        """Files containing ``query``; None if ``token`` was cancelled part way."""
+        needle = query.lower()
+        if not needle:
+            return []
+        files = self.index.files()  # refreshes the index if it is stale
+        version = self.index.version
+        key, base = self._base(needle, version)
+        if key == needle:
+            return base
+        found = self.index.matches(needle, base if base is not None else files, token)
+        if found is None:
+            return None
+        if len(needle) >= MIN_PREFETCH_CHARS:
+            self._store(needle, found, version)
+        return found
+
+    def prefetch(self, partial: str, token=None) -> int:
+        """Warm the cache for partially typed input; returns the number of matching files (-1 if cancelled)."""
+        partial = partial.strip()
+        if len(partial) < MIN_PREFETCH_CHARS:
+            return 0
+        found = self.matches(partial, token)
+        return -1 if found is None else len(found)
@@ -0,0 +1,220 @@
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+PATTERNS = ('**/*.py', '**/*.md', '**/*.json')
+# Minimum seconds between directory walks; file contents are only re-read when they change
+REFRESH_INTERVAL = 2.0
+# How many files to scan between cancellation checks
+CANCEL_CHECK_EVERY = 64
+
+
+class IndexedFile:
+    """One indexed file. Files loaded from a shared index keep no text in memory:
+    ``content`` reads it from the database on each access."""
+
+    __slots__ = ('path', 'abs_path', 'mtime', 'size', 'digest', '_content', '_load')
+
+    def __init__(self, path: str, abs_path: str, mtime: float, size: int, content: Optional[str],
+                 digest: str = None, load: Callable[[str], str] = None):
+        self.path = path
+        self.abs_path = abs_path
+        self.mtime = mtime
+        self.size = size
+        self._content = content
+        self._load = load
+        self.digest = digest or hashlib.sha1(content.encode('utf-8', errors='replace')).hexdigest()
+
+    @property
+    def content(self) -> str:
+        return self._content if self._content is not None else self._load(self.path)
+
+    @property
+    def in_memory(self) -> bool:
+        return self._content is not None
+
+
+def matcher(query: str) -> Callable[[str], Optional[re.Match]]:
+    """Case-insensitive substring test for ``query``, without keeping a lowercased copy of every file."""
+    return re.compile(re.escape(query), re.IGNORECASE).search
+
+
+class ProjectIndex:
+    """In-memory index of the project's text files, refreshed incrementally.
+
+    Each refresh walks the tree and stats every file, but only re-reads files
+    whose mtime or size changed, so repeated queries stop paying for disk I/O.
+
+    With ``shared`` (a shared.SharedIndex) several server processes share one
+    index: the process for which ``is_writer()`` is true walks the tree and
+    publishes its changes. The others load only paths, sizes and digests from
+    the database; they read file contents from it when needed and search it
+    there, so the index is held in memory once rather than once per worker.
+    """
+
+    def __init__(self, root: str, patterns: Sequence[str] = PATTERNS, shared=None,
+                 is_writer: Callable[[], bool] = None):
+        self.root = root
+        self.patterns = tuple(patterns)
+        self.shared = shared
+        self._is_writer = is_writer or (lambda: True)
+        self._files: Dict[str, IndexedFile] = {}
+        self._lock = threading.Lock()
+        self._walk_lock = threading.Lock()
+        self._last_walk = 0.0
+        self._shared_version = None
+        self.version = 0
+
+    def _load_shared(self) -> Optional[int]:
+        """Apply the writer's published changes; None if nothing has been published yet."""
+        version = self.shared.version()
+        if not version:
+            return None
+        if version == self._shared_version:
+            return 0
+        have = {path: f.digest for path, f in self._files.items()}
+        version, rows, removed = self.shared.load(have)
+        files = dict(self._files)
+        for row in rows:
+            files[row['path']] = IndexedFile(row['path'], os.path.join(self.root, row['path']), row['mtime'],
+                                             row['size'], None, row['digest'], self.shared.content)
+        for path in removed:
+            files.pop(path, None)
+        changed = len(rows) + len(removed)
+        with self._lock:
+            self._files = files
+            self._shared_version = version
+            if changed:
+                self.version += 1
+        return changed
+
+    def refresh(self, force: bool = False, reread: bool = False, pause: Callable[[], None] = None) -> int:
+        """Bring the index up to date; returns the number of files added, changed or removed.
+
+        With ``reread`` every file is read again even if its mtime and size are unchanged.
+        ``pause`` is called before each file read, so a long walk can wait for other work.
+        The tree is walked without holding the index lock: queries keep being answered
+        from the current files until the new set is swapped in.
+        """
+        now = time.monotonic()
+        if not force and not reread and self._files and now - self._last_walk < REFRESH_INTERVAL:
+            return 0
+        # One walk at a time; a routine refresh serves the current index instead of waiting for it
+        if not self._walk_lock.acquire(blocking=force or reread or not self._files):
+            return 0
+        try:
+            if not force and not reread and self._files and now - self._last_walk < REFRESH_INTERVAL:
+                return 0  # another thread walked while this one waited
+            publish = self.shared is not None and self._is_writer()
+            if self.shared is not None and not publish:
+                changed = self._load_shared()
+                if changed is not None:
+                    self._last_walk = now
+                    return changed
+                # No writer has published yet; walk the tree locally in the meantime
+            current = self._files
+            seen = {}
+            updated = []
+            changed = 0
+            for pattern in self.patterns:
+                for abs_path in glob.glob(os.path.join(self.root, pattern), recursive=True):
+                    rel_path = os.path.relpath(abs_path, self.root)
+                    if rel_path in seen:
+                        continue
+                    try:
+                        st = os.stat(abs_path)
+                    except OSError:
+                        continue
+                    old = current.get(rel_path)
+                    if not reread and old is not None and old.mtime == st.st_mtime and old.size == st.st_size:
+                        seen[rel_path] = old
+                        continue
+                    if pause is not None:
+                        pause()
+                    try:
+                        with open(abs_path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                    except (OSError, UnicodeDecodeError):
+                        continue
+                    seen[rel_path] = IndexedFile(rel_path, abs_path, st.st_mtime, st.st_size, content)
+                    updated.append(seen[rel_path])
+                    changed += 1
+            removed = list(current.keys() - seen.keys())
+            changed += len(removed)
+            if publish and self._shared_version is None:
+                # First walk as writer: replace whatever an earlier run left in the database
+                self.shared.publish(list(seen.values()), replace=True)
+                self._shared_version = self.shared.version()
+            elif publish and changed:
+                self.shared.publish(updated, removed)
+                self._shared_version = self.shared.version()
+            with self._lock:
+                self._files = seen
+                self._last_walk = now
+                if changed:
+                    self.version += 1
+            return changed
+        finally:
+            self._walk_lock.release()
+
+    def rebuild(self, pause: Callable[[], None] = None) -> int:
+        """Re-read the whole tree; the old index keeps serving queries until the new one is swapped in."""
+        return self.refresh(reread=True, pause=pause)
+
+    def files(self) -> List[IndexedFile]:
+        self.refresh()
+        return list(self._files.values())
+
+    def get(self, path: str) -> Optional[IndexedFile]:
+        self.refresh()
+        return self._files.get(path)
+
+    def search(self, query: str) -> List[IndexedFile]:
+        """Files whose content contains ``query`` (case-insensitive)."""
+        return self.search_many([query])[0]
+
+    def search_many(self, queries: Sequence[str]) -> List[List[IndexedFile]]:
+        """Match several queries in a single pass over the index."""
+        files = self.files()
+        stored = self._search_stored(queries, files)
+        tests = [matcher(q) if q else None for q in queries]
+        results: List[List[IndexedFile]] = [[] for _ in tests]
+        for f in files:
+            for i, test in enumerate(tests):
+                if test is not None and (test(f.content) if f.in_memory else f.path in stored[i]):
+                    results[i].append(f)
+        return results
+
+    def matches(self, query: str, files: Sequence[IndexedFile] = None, token=None) -> Optional[List[IndexedFile]]:
+        """The ``files`` (default: all) whose content contains ``query``; None if ``token`` was cancelled part way."""
+        files = self.files() if files is None else files
+        stored = self._search_stored([query], files, token)
+        if stored is None:
+            return None
+        test = matcher(query)
+        found = []
+        for i, f in enumerate(files):
+            if token is not None and i % CANCEL_CHECK_EVERY == 0 and token.cancelled:
+                return None
+            if test(f.content) if f.in_memory else f.path in stored[0]:
+                found.append(f)
+        return found
+
+    def _search_stored(self, queries: Sequence[str], files: Sequence[IndexedFile], token=None):
+        """Paths matching each query among ``files`` kept in the shared database; None if cancelled."""
+        paths = [f.path for f in files if not f.in_memory]
+        if not paths:
+            return [set() for _ in queries]
+        # A full scan in SQLite beats binding every path when most of the index is wanted
+        among = paths if len(paths) < len(self._files) // 2 else None
+        results = []
+        for q in queries:
+            found = self.shared.search(q, among, token) if q else set()
+            if found is None:
+                return None
+            results.append(found)
+        return results
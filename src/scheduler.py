@@ -0,0 +1,409 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+try:
+    from store import DB_PATH, connect
+    from shared import LEASE_TTL, get_shared_load
+except ImportError:
+    from src.store import DB_PATH, connect
+    from src.shared import LEASE_TTL, get_shared_load
+
+# Background jobs never use more threads than this
+SCHEDULER_WORKERS = int(os.environ.get('FRANCIS_SCHEDULER_WORKERS', '2'))
+# Jobs wait while at least this many interactive requests are in flight...
+BUSY_THRESHOLD = int(os.environ.get('FRANCIS_SCHEDULER_BUSY', '1'))
+# ...but never longer than this past their due time
+MAX_DEFER = 600.0
+TICK = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    every REAL,
+    cron TEXT,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    next_run REAL NOT NULL,
+    last_run REAL,
+    last_status TEXT,
+    last_error TEXT,
+    runs INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class InteractiveLoad:
+    """Counts interactive requests in flight so background jobs can stay out of their way.
+
+    With ``shared`` (a shared.SharedLoad) the count is published for the other
+    server workers and theirs are included in ``busy``. A reporter thread does
+    the database writes, at each change and every LEASE_TTL / 3 seconds, so
+    request handlers never wait on the database.
+    """
+
+    def __init__(self, shared=None):
+        self.shared = shared
+        self._active = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._changed = threading.Event()
+        self._reporter = None
+
+    @contextmanager
+    def track(self):
+        with self._lock:
+            self._active += 1
+        self._report()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._idle.notify_all()
+            self._report()
+
+    def _report(self):
+        if self.shared is None:
+            return
+        self._changed.set()
+        if self._reporter is None:
+            with self._lock:
+                if self._reporter is None:
+                    self._reporter = threading.Thread(target=self._run_reporter, name='francis-load', daemon=True)
+                    self._reporter.start()
+
+    def _run_reporter(self):
+        while True:
+            self._changed.wait(LEASE_TTL / 3)
+            self._changed.clear()
+            shared = self.shared
+            if shared is None:
+                return
+            try:
+                shared.report(self._active)
+            except sqlite3.Error:
+                pass
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def busy(self, threshold: int = BUSY_THRESHOLD) -> bool:
+        active, shared = self._active, self.shared
+        if shared is not None and active < threshold:
+            try:
+                active += shared.others()
+            except sqlite3.Error:
+                pass
+        return active >= threshold
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Block while busy, for at most ``timeout`` seconds; True if no longer busy."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        while self.busy():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._idle:
+                # Other workers' requests end without notifying; look again every TICK
+                self._idle.wait(min(remaining, TICK))
+        return True
+
+    def close(self):
+        """Stop reporting and drop this process's row."""
+        shared, self.shared = self.shared, None
+        if shared is not None:
+            self._changed.set()
+            try:
+                shared.close()
+            except sqlite3.Error:
+                pass
+
+
+load = InteractiveLoad(get_shared_load())
+
+
+class Cron:
+    """Five-field cron expression: minute hour day-of-month month day-of-week (0 = Sunday)."""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(f, lo, hi) for f, (lo, hi) in zip(fields, self.RANGES))
+        # Standard cron: when both day fields are restricted, either may match
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field: str, lo: int, hi: int) -> frozenset:
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+            if part == '*':
+                start, end = lo, hi
+            elif '-' in part:
+                start, end = (int(x) for x in part.split('-', 1))
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+            if start < lo or end > hi or start > end or step < 1:
+                raise ValueError(f"cron field out of range: {field!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, dt: datetime) -> bool:
+        in_days = dt.day in self.days
+        in_weekdays = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return in_weekdays
+        if self._any_weekday:
+            return in_days
+        return in_days or in_weekdays
+
+    def next_after(self, ts: float) -> float:
+        """First matching minute strictly after ``ts`` (local time)."""
+        dt = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+        raise ValueError(f"cron expression never matches: {self.expr!r}")
+
+
+# Task name -> callable run in the worker pool
+TASKS: Dict[str, Callable[[], object]] = {}
+
+
+def task(name: str):
+    """Register a function as a schedulable task."""
+    def register(fn):
+        TASKS[name] = fn
+        return fn
+    return register
+
+
+class Scheduler:
+    """Interval and cron jobs persisted in SQLite and run from the asyncio loop.
+
+    Due jobs run in a small thread pool, one run per job at a time. While
+    interactive requests are in flight (see ``load``) jobs are deferred, up to
+    MAX_DEFER seconds past their due time. A job that has already started is
+    not interrupted; long tasks check ``load`` themselves between units of
+    work (the index rebuild pauses between files, summaries stop early).
+    """
+
+    def __init__(self, path: str = DB_PATH, workers: int = SCHEDULER_WORKERS):
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='francis-job')
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _next_run(every: Optional[float], cron: Optional[str], after: float) -> float:
+        return Cron(cron).next_after(after) if cron else after + every
+
+    def add(self, name: str, task_name: str, every: float = None, cron: str = None,
+            replace: bool = False) -> bool:
+        """Persist a job. Existing jobs keep their state unless ``replace`` is set; returns True if written."""
+        if (every is None) == (cron is None):
+            raise ValueError("give exactly one of 'every' or 'cron'")
+        if task_name not in TASKS:
+            raise ValueError(f"unknown task {task_name!r}")
+        next_run = self._next_run(every, cron, time.time())
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        with self._lock, self._conn:
+            written = self._conn.execute(
+                f'{verb} INTO jobs (name, task, every, cron, next_run) VALUES (?, ?, ?, ?, ?)',
+                (name, task_name, every, cron, next_run)).rowcount
+        self._poke()
+        return bool(written)
+
+    def remove(self, name: str) -> bool:
+        with self._lock, self._conn:
+            return bool(self._conn.execute('DELETE FROM jobs WHERE name = ?', (name,)).rowcount)
+
+    def set_enabled(self, name: str, enabled: bool) -> bool:
+        with self._lock, self._conn:
+            changed = self._conn.execute('UPDATE jobs SET enabled = ? WHERE name = ?',
+                                         (int(enabled), name)).rowcount
+        self._poke()
+        return bool(changed)
+
+    def run_now(self, name: str) -> bool:
+        """Make a job due immediately (it still yields to interactive load)."""
+        with self._lock, self._conn:
+            changed = self._conn.execute('UPDATE jobs SET next_run = ? WHERE name = ?',
+                                         (time.time(), name)).rowcount
+        self._poke()
+        return bool(changed)
+
+    def jobs(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM jobs ORDER BY next_run').fetchall()
+        result = []
+        for row in rows:
+            job = dict(row)
+            job['running'] = job['name'] in self._running
+            result.append(job)
+        return result
+
+    def _due(self, now: float) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute('SELECT * FROM jobs WHERE enabled = 1 AND next_run <= ? ORDER BY next_run',
+                                      (now,)).fetchall()
+
+    def _seconds_to_next(self, now: float) -> float:
+        with self._lock:
+            row = self._conn.execute('SELECT MIN(next_run) AS next_run FROM jobs WHERE enabled = 1').fetchone()
+        if row['next_run'] is None:
+            return 60.0
+        return max(TICK, min(60.0, row['next_run'] - now))
+
+    def _poke(self):
+        if self._wake is not None and self._loop_task is not None:
+            self._loop_task.get_loop().call_soon_threadsafe(self._wake.set)
+
+    async def _run_job(self, job: sqlite3.Row):
+        loop = asyncio.get_running_loop()
+        status, error = 'ok', None
+        try:
+            await loop.run_in_executor(self._pool, TASKS[job['task']])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status, error = 'error', str(e)
+        finally:
+            self._running.pop(job['name'], None)
+        finished = time.time()
+        # Schedule from the finish time so a slow job never piles up runs
+        next_run = self._next_run(job['every'], job['cron'], finished)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE jobs SET last_run = ?, last_status = ?, last_error = ?, runs = runs + 1, next_run = ? '
+                'WHERE name = ?', (finished, status, error, next_run, job['name']))
+
+    async def run(self):
+        """Scheduler loop; run it as a task on the app's event loop."""
+        self._wake = asyncio.Event()
+        while True:
+            now = time.time()
+            for job in self._due(now):
+                if job['name'] in self._running:
+                    continue
+                if job['task'] not in TASKS:
+                    continue
+                # Interactive requests come first, unless the job has waited too long
+                if load.busy() and now - job['next_run'] < MAX_DEFER:
+                    break
+                self._running[job['name']] = asyncio.create_task(self._run_job(job))
+            self._wake.clear()
+            delay = TICK if load.busy() else self._seconds_to_next(time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the loop on the running event loop (call from an async context)."""
+        if self._loop_task is None:
+            self._loop_task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        tasks = [t for t in [self._loop_task, *self._running.values()] if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+        self._pool.shutdown(wait=False)
+        with self._lock:
+            self._conn.close()
+
+
+# Built-in tasks
+
+@task('rediscover_devices')
+def rediscover_devices():
+    try:
+        from intents import refresh_devices
+    except ImportError:
+        from src.intents import refresh_devices
+    refresh_devices()
+
+
+@task('prewarm_model')
+def prewarm_model():
+    try:
+        from engine import model_manager
+    except ImportError:
+        from src.engine import model_manager
+    model_manager.maintain()
+
+
+@task('rebuild_index')
+def rebuild_index():
+    try:
+        from engine import project_index
+    except ImportError:
+        from src.engine import project_index
+    # Pause between file reads while chat requests are in flight, up to MAX_DEFER in total
+    deadline = time.monotonic() + MAX_DEFER
+    project_index.rebuild(pause=lambda: load.wait_idle(deadline - time.monotonic()))
+
+
+@task('summarize_files')
+def summarize_files():
+    try:
+        from engine import complete, project_index
+        from summaries import get_summary_cache
+    except ImportError:
+        from src.engine import complete, project_index
+        from src.summaries import get_summary_cache
+    cache = get_summary_cache()
+    files = project_index.files()
+    for f in files:
+        cache.summary_for(f)
+    cache.summarize_pending(files, complete, busy=load.busy)
+    cache.prune([f.digest for f in files])
+
+
+# name -> (task, every, cron); added on first start, then editable in the database
+DEFAULT_JOBS = {
+    'rediscover_devices': ('rediscover_devices', 600.0, None),
+    'prewarm_model': ('prewarm_model', 240.0, None),
+    'rebuild_index': ('rebuild_index', None, '0 3 * * *'),
+    'summarize_files': ('summarize_files', 1800.0, None),
+}
+
+
+def create_scheduler(path: str = DB_PATH) -> Scheduler:
+    scheduler = Scheduler(path)
+    for name, (task_name, every, cron) in DEFAULT_JOBS.items():
+        scheduler.add(name, task_name, every=every, cron=cron)
+    return scheduler
@@ -0,0 +1,54 @@
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+SESSION_TTL = 3600       # seconds of inactivity before a session is dropped
+MAX_SESSIONS = 1000
+MAX_HISTORY_TURNS = 50   # turns kept per session (the prompt only uses the most recent ones)
+
+
+class ChatSession:
+    """Server-side conversation state for one client."""
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.history: List[Tuple[str, str]] = []
+        self.last_seen = time.monotonic()
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def add_turn(self, message: str, reply: str):
+        self.history.append((message, reply))
+        del self.history[:-MAX_HISTORY_TURNS]
+
+
+class SessionStore:
+    """In-memory sessions with idle expiry and a size cap."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, ChatSession] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str] = None) -> ChatSession:
+        """Return the session for ``session_id``, creating a new one if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id or uuid.uuid4().hex)
+                self._sessions[session.id] = session
+            session.touch()
+            return session
+
+    def _evict(self, now: float):
+        for sid in [sid for sid, s in self._sessions.items() if now - s.last_seen > self.ttl]:
+            del self._sessions[sid]
+        if len(self._sessions) >= self.max_sessions:
+            oldest = sorted(self._sessions.values(), key=lambda s: s.last_seen)
+            for s in oldest[:len(self._sessions) - self.max_sessions + 1]:
+                del self._sessions[s.id]
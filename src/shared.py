@@ -0,0 +1,328 @@
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    from store import DB_PATH, connect
+except ImportError:
+    from src.store import DB_PATH, connect
+
+# API server processes sharing the database; `python -m src.app --workers N` sets this for its workers
+WORKERS = int(os.environ.get('FRANCIS_WORKERS', '1'))
+# The writer renews its lease every LEASE_TTL / 3 seconds; another worker takes over once it lapses
+LEASE_TTL = 15.0
+# Finished responses are reused for identical prompts this long (seconds); off unless set
+RESPONSE_CACHE_TTL = float(os.environ.get('FRANCIS_RESPONSE_CACHE_TTL', '0'))
+RESPONSE_CACHE_MAX = 5000
+# Expired responses are pruned after this many inserts
+PRUNE_EVERY = 100
+# A cancellable index search checks its token every this many SQLite VM steps
+SEARCH_PROGRESS_STEPS = 10000
+MAX_BOUND_PATHS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_created ON responses(created);
+CREATE TABLE IF NOT EXISTS interactive_load (
+    owner TEXT PRIMARY KEY,
+    active INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def multi_process() -> bool:
+    return WORKERS > 1
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    conn.commit()
+    return conn
+
+
+class Lease:
+    """A named lease in the shared database, held by at most one process at a time.
+
+    The holder calls ``acquire`` again well within LEASE_TTL to renew it. If the
+    holder dies or hangs the lease expires, and the next worker to call
+    ``acquire`` takes over. Times are wall-clock so every process agrees.
+    """
+
+    def __init__(self, name: str, path: str = DB_PATH, ttl: float = LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.owner = _owner()
+        self.held = False
+        self._conn = _open(path)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Take or renew the lease; True if this process holds it afterwards."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires '
+                'WHERE leases.owner = excluded.owner OR leases.expires < ?',
+                (self.name, self.owner, now + self.ttl, now))
+            row = self._conn.execute('SELECT owner FROM leases WHERE name = ?', (self.name,)).fetchone()
+            self.held = row is not None and row['owner'] == self.owner
+        return self.held
+
+    def release(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (self.name, self.owner))
+            self.held = False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedIndex:
+    """Project index rows in the shared database.
+
+    The writer publishes the files its directory walks add, change or remove,
+    bumping a version number; other workers compare versions and load the
+    metadata of rows whose digest changed, so the tree is walked and read by
+    one process. Readers fetch contents and run searches here on demand.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self._conn = _open(path)
+        self._lock = threading.Lock()
+
+    def version(self) -> int:
+        with self._lock:
+            row = self._conn.execute('SELECT version FROM index_meta WHERE id = 1').fetchone()
+        return row['version'] if row else 0
+
+    def publish(self, changed: Sequence, removed: Sequence[str] = (), replace: bool = False):
+        """Store changed IndexedFiles and forget removed paths as one new version.
+
+        With ``replace`` ``changed`` is the whole index and every other row is dropped.
+        """
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute('DELETE FROM index_files')
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO index_files (path, mtime, size, digest, content) VALUES (?, ?, ?, ?, ?)',
+                [(f.path, f.mtime, f.size, f.digest, f.content) for f in changed])
+            self._conn.executemany('DELETE FROM index_files WHERE path = ?', [(p,) for p in removed])
+            self._conn.execute(
+                'INSERT INTO index_meta (id, version, updated) VALUES (1, 1, ?) '
+                'ON CONFLICT(id) DO UPDATE SET version = version + 1, updated = excluded.updated',
+                (time.time(),))
+
+    def load(self, have: Dict[str, str]) -> Tuple[int, List[sqlite3.Row], List[str]]:
+        """Rows that differ from ``have`` ({path: digest}) and the paths no longer published.
+
+        Returns (version, changed rows without content, removed paths), read in one transaction.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                row = self._conn.execute('SELECT version FROM index_meta WHERE id = 1').fetchone()
+                version = row['version'] if row else 0
+                listing = self._conn.execute('SELECT path, mtime, size, digest FROM index_files').fetchall()
+            finally:
+                self._conn.commit()
+        changed = [r for r in listing if have.get(r['path']) != r['digest']]
+        removed = list(have.keys() - {r['path'] for r in listing})
+        return version, changed, removed
+
+    def content(self, path: str) -> str:
+        """A published file's text ('' if it is no longer published)."""
+        with self._lock:
+            row = self._conn.execute('SELECT content FROM index_files WHERE path = ?', (path,)).fetchone()
+        return row['content'] if row else ''
+
+    def search(self, query: str, paths: Sequence[str] = None, token=None) -> Optional[Set[str]]:
+        """Paths (among ``paths``, default all) whose content contains ``query``; None if ``token`` was cancelled.
+
+        The scan runs inside SQLite, whose lower() folds ASCII letters only.
+        """
+        needle = query.lower()
+        sql = 'SELECT path FROM index_files WHERE instr(lower(content), ?) > 0'
+        with self._lock:
+            if token is not None:
+                self._conn.set_progress_handler(lambda: token.cancelled, SEARCH_PROGRESS_STEPS)
+            try:
+                if paths is None:
+                    rows = self._conn.execute(sql, (needle,)).fetchall()
+                else:
+                    rows = []
+                    for i in range(0, len(paths), MAX_BOUND_PATHS):
+                        chunk = paths[i:i + MAX_BOUND_PATHS]
+                        rows += self._conn.execute(f"{sql} AND path IN ({','.join('?' * len(chunk))})",
+                                                   (needle, *chunk)).fetchall()
+            except sqlite3.OperationalError:
+                if token is not None and token.cancelled:
+                    return None  # interrupted by the progress handler
+                raise
+            finally:
+                if token is not None:
+                    self._conn.set_progress_handler(None, 0)
+        return {r['path'] for r in rows}
+
+
+class ResponseCache:
+    """Finished responses keyed by a hash of the model, options and full prompt.
+
+    Lives in the shared database, so a prompt answered by one worker is a
+    cache hit for all of them. Only requests without conversation state use it.
+    """
+
+    def __init__(self, path: str = DB_PATH, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = _open(path)
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha1('\0'.join(map(str, parts)).encode('utf-8', errors='replace')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT response FROM responses WHERE key = ? AND created >= ?',
+                                     (key, time.time() - self.ttl)).fetchone()
+        return row['response'] if row else None
+
+    def put(self, key: str, response: str):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)',
+                               (key, response, time.time()))
+            self._inserts += 1
+            if self._inserts % PRUNE_EVERY == 0:
+                self._conn.execute('DELETE FROM responses WHERE created < ?', (time.time() - self.ttl,))
+                self._conn.execute('DELETE FROM responses WHERE key NOT IN '
+                                   '(SELECT key FROM responses ORDER BY created DESC LIMIT ?)', (self.max_entries,))
+
+
+class SharedLoad:
+    """Interactive requests in flight in each server process.
+
+    Every worker keeps its own row current, so the writer's background work
+    also yields to chats running in the other workers. Rows not refreshed
+    within ``ttl`` (a worker that died) are ignored.
+    """
+
+    def __init__(self, path: str = DB_PATH, ttl: float = LEASE_TTL):
+        self.owner = _owner()
+        self.ttl = ttl
+        self._conn = _open(path)
+        self._lock = threading.Lock()
+
+    def report(self, active: int):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO interactive_load (owner, active, updated) VALUES (?, ?, ?)',
+                               (self.owner, active, time.time()))
+
+    def others(self) -> int:
+        """Requests in flight in the other live workers."""
+        with self._lock:
+            row = self._conn.execute('SELECT COALESCE(SUM(active), 0) AS n FROM interactive_load '
+                                     'WHERE owner != ? AND updated >= ?',
+                                     (self.owner, time.time() - self.ttl)).fetchone()
+        return row['n']
+
+    def close(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM interactive_load WHERE owner = ?', (self.owner,))
+            self._conn.close()
+
+
+_writer = None
+_cache = None
+_index = None
+_shared_lock = threading.Lock()
+
+
+def writer_lease() -> Lease:
+    """The lease that makes one worker the writer (index walks, scheduler, memory)."""
+    global _writer
+    with _shared_lock:
+        if _writer is None:
+            _writer = Lease('writer')
+        return _writer
+
+
+def is_writer() -> bool:
+    """Whether this process does the shared writes: always in single-process mode,
+    otherwise while it holds the writer lease."""
+    if not multi_process():
+        return True
+    return _writer is not None and _writer.held
+
+
+def get_shared_index() -> Optional[SharedIndex]:
+    """The shared index in multi-process mode; None when this process is the only one."""
+    global _index
+    if not multi_process():
+        return None
+    with _shared_lock:
+        if _index is None:
+            try:
+                _index = SharedIndex()
+            except (OSError, sqlite3.Error):
+                return None
+        return _index
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The shared response cache, or None if it is disabled or the database cannot be opened."""
+    global _cache
+    if RESPONSE_CACHE_TTL <= 0:
+        return None
+    with _shared_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache()
+            except (OSError, sqlite3.Error):
+                return None
+        return _cache
+
+
+def get_shared_load() -> Optional[SharedLoad]:
+    """Cross-process request counts in multi-process mode; None when this process is the only one."""
+    if not multi_process():
+        return None
+    try:
+        return SharedLoad()
+    except (OSError, sqlite3.Error):
+        return None
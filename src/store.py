@@ -0,0 +1,205 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+DATA_DIR = os.environ.get('FRANCIS_DATA_DIR', os.path.join(os.path.expanduser('~'), '.francis'))
+DB_PATH = os.path.join(DATA_DIR, 'francis.db')
+PAGE_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    created REAL NOT NULL,
+    prompt TEXT NOT NULL,
+    response TEXT NOT NULL,
+    duration_ms INTEGER,
+    context_files TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS turns_session_id ON turns(session, id);
+CREATE INDEX IF NOT EXISTS turns_created ON turns(created);
+"""
+
+# Full-text index kept in sync by triggers; skipped if SQLite lacks FTS5
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+    prompt, response, content='turns', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS turns_ai AFTER INSERT ON turns BEGIN
+    INSERT INTO turns_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response);
+END;
+CREATE TRIGGER IF NOT EXISTS turns_ad AFTER DELETE ON turns BEGIN
+    INSERT INTO turns_fts(turns_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response);
+END;
+"""
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    """Open the database in WAL mode so readers never block the writer."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class ConversationStore:
+    """Persistent record of conversation turns.
+
+    ``record`` only enqueues; a background thread batches inserts into one
+    transaction, so callers on the UI or request thread never wait on disk.
+    Reads use their own connection and are paged by turn id.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        conn.commit()
+        conn.close()
+        self._read_lock = threading.Lock()
+        self._reader = connect(path)
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name='francis-store', daemon=True)
+        self._writer.start()
+
+    def record(self, session: str, prompt: str, response: str, duration_ms: int = None,
+               context_files: Sequence[str] = None, source: str = None):
+        """Queue a turn for writing; returns immediately."""
+        self._queue.put((session, time.time(), prompt, response, duration_ms,
+                         json.dumps(list(context_files or [])), source))
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        stop = False
+        while not stop:
+            batch, markers = [], []
+            item = self._queue.get()
+            # Drain whatever else is waiting into the same transaction
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            'INSERT INTO turns (session, created, prompt, response, duration_ms, context_files, source) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+                except sqlite3.Error:
+                    pass
+            for marker in markers:
+                marker.set()
+        conn.close()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until turns queued so far are written."""
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def _rows(self, sql: str, params: Sequence) -> List[Dict]:
+        with self._read_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            turn = dict(row)
+            turn['context_files'] = json.loads(turn['context_files'] or '[]')
+            result.append(turn)
+        return result
+
+    def history(self, session: str, before_id: int = None, limit: int = PAGE_SIZE) -> List[Dict]:
+        """One page of a session's turns, newest first. Pass the smallest id seen as ``before_id`` for the next page."""
+        if before_id is None:
+            return self._rows('SELECT * FROM turns WHERE session = ? ORDER BY id DESC LIMIT ?', (session, limit))
+        return self._rows('SELECT * FROM turns WHERE session = ? AND id < ? ORDER BY id DESC LIMIT ?',
+                          (session, before_id, limit))
+
+    def recent(self, since: float = None, until: float = None, limit: int = PAGE_SIZE) -> List[Dict]:
+        """Turns across all sessions within a time range, newest first."""
+        return self._rows('SELECT * FROM turns WHERE created >= ? AND created < ? ORDER BY created DESC LIMIT ?',
+                          (since or 0, until or time.time() + 1, limit))
+
+    def sessions(self, limit: int = PAGE_SIZE, source: str = None) -> List[Dict]:
+        """Most recently active sessions with their turn counts, optionally only those from ``source``."""
+        where, params = ('WHERE source = ? ', (source, limit)) if source else ('', (limit,))
+        with self._read_lock:
+            rows = self._reader.execute(
+                'SELECT session, COUNT(*) AS turns, MAX(created) AS last_active FROM turns ' + where +
+                'GROUP BY session ORDER BY last_active DESC LIMIT ?', params).fetchall()
+        return [dict(r) for r in rows]
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """Full-text search over prompts and responses, best matches first."""
+        if not query.strip():
+            return []
+        if self.has_fts:
+            # Quote each term so user input cannot inject FTS query syntax
+            match = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+            try:
+                return self._rows(
+                    'SELECT turns.* FROM turns_fts JOIN turns ON turns.id = turns_fts.rowid '
+                    'WHERE turns_fts MATCH ? ORDER BY bm25(turns_fts) LIMIT ?', (match, limit))
+            except sqlite3.OperationalError:
+                pass
+        like = f'%{query}%'
+        return self._rows('SELECT * FROM turns WHERE prompt LIKE ? OR response LIKE ? ORDER BY id DESC LIMIT ?',
+                          (like, like, limit))
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join(5)
+        with self._read_lock:
+            self._reader.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[ConversationStore]:
+    """Return the shared store, or None if the database cannot be opened."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = ConversationStore()
+            except (OSError, sqlite3.Error):
+                return None
+        return _store
+
+
+def shutdown():
+    """Write out pending turns and close the shared store."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+def record_turn(session: str, prompt: str, response: str, started: float,
+                context_files: Sequence[str] = None, source: str = None):
+    """Record a finished turn on the shared store; ``started`` is a ``time.perf_counter()`` value."""
+    store = get_store()
+    if store is not None:
+        store.record(session, prompt, response, int((time.perf_counter() - started) * 1000),
+                     context_files, source)
@@ -0,0 +1,325 @@
+import ast
+import os
+import re
+import sys
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    from project_index import IndexedFile, ProjectIndex
+except ImportError:
+    from src.project_index import IndexedFile, ProjectIndex
+
+# Longest answer listing, so a common name does not flood the chat
+MAX_LISTED = 20
+# Calls to these are everywhere and say nothing about structure
+IGNORED_CALLS = frozenset('print len str int float bool list dict set tuple isinstance getattr setattr hasattr '
+                          'range enumerate zip sorted min max sum any all super join append get'.split())
+
+
+class Symbol:
+    __slots__ = ('name', 'kind', 'path', 'line', 'signature', 'parent')
+
+    def __init__(self, name: str, kind: str, path: str, line: int, signature: str, parent: str = None):
+        self.name = name
+        self.kind = kind  # 'class', 'function' or 'method'
+        self.path = path
+        self.line = line
+        self.signature = signature
+        self.parent = parent
+
+    @property
+    def qualname(self) -> str:
+        return f"{self.parent}.{self.name}" if self.parent else self.name
+
+
+class ModuleInfo:
+    """Symbols, imports and call references of one Python file."""
+
+    __slots__ = ('path', 'symbols', 'imports', 'calls')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.symbols: List[Symbol] = []
+        self.imports: List[str] = []
+        # Qualified name of the calling function ('<module>' at top level) -> what it calls,
+        # with the receiver: 'refresh', 'self.refresh', 'project_index.refresh', '*.refresh'
+        self.calls: Dict[str, Set[str]] = defaultdict(set)
+
+
+def _signature(node) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = ', '.join(ast.unparse(b) for b in node.bases)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+    prefix = 'async def' if isinstance(node, ast.AsyncFunctionDef) else 'def'
+    return f"{prefix} {node.name}({ast.unparse(node.args)})"
+
+
+def _dotted(node) -> Optional[str]:
+    """'a.b.c' for a chain of names and attributes, else None."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f"{base}.{node.attr}" if base else None
+    return None
+
+
+def _called_name(node: ast.Call) -> Optional[str]:
+    """The called name with its receiver, e.g. 're.search' or 'self.search'; '*.attr' for computed receivers."""
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return _dotted(node.func) or f"*.{node.func.attr}"
+    return None
+
+
+def _stdlib_names(tree: ast.AST) -> Set[str]:
+    """Names a module binds by importing from the standard library ('re', 'path' for 'from os import path')."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update((a.asname or a.name).split('.')[0] for a in node.names
+                         if a.name.split('.')[0] in sys.stdlib_module_names)
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module \
+                and node.module.split('.')[0] in sys.stdlib_module_names:
+            names.update(a.asname or a.name for a in node.names)
+    return names
+
+
+def _short(name: str) -> str:
+    return name.rsplit('.', 1)[-1]
+
+
+class _Collector(ast.NodeVisitor):
+    def __init__(self, info: ModuleInfo, stdlib: Set[str] = frozenset()):
+        self.info = info
+        self.stdlib = stdlib
+        self.scope: List[str] = []
+        self.classes: List[str] = []
+
+    def _define(self, node, kind: str):
+        parent = '.'.join(self.scope) or None
+        self.info.symbols.append(Symbol(node.name, kind, self.info.path, node.lineno, _signature(node), parent))
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    def visit_ClassDef(self, node):
+        self.classes.append(node.name)
+        self._define(node, 'class')
+        self.classes.pop()
+
+    def visit_FunctionDef(self, node):
+        in_class = bool(self.scope) and bool(self.classes) and self.scope[-1] == self.classes[-1]
+        self._define(node, 'method' if in_class else 'function')
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Import(self, node):
+        self.info.imports.extend(alias.name for alias in node.names)
+
+    def visit_ImportFrom(self, node):
+        self.info.imports.append('.' * node.level + (node.module or ''))
+
+    def visit_Call(self, node):
+        name = _called_name(node)
+        # Standard library calls (re.search, os.path.join) say nothing about the project
+        if name and _short(name) not in IGNORED_CALLS and name.split('.')[0] not in self.stdlib:
+            self.info.calls['.'.join(self.scope) or '<module>'].add(name)
+        self.generic_visit(node)
+
+
+def parse_module(path: str, content: str) -> ModuleInfo:
+    info = ModuleInfo(path)
+    try:
+        tree = ast.parse(content)
+        _Collector(info, _stdlib_names(tree)).visit(tree)
+    except (SyntaxError, ValueError, RecursionError):
+        pass
+    return info
+
+
+def _module_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _size(n: int) -> str:
+    return f"{n} B" if n < 1024 else f"{n / 1024:.1f} KB"
+
+
+class StructureIndex:
+    """File tree and Python symbol table of the project, derived from a ProjectIndex.
+
+    Modules are parsed once per content digest, so a refresh after an edit
+    re-parses only the files that changed. Answers questions such as "what
+    files are in this project", "where is X defined" or "what calls X"
+    without reading file contents into a prompt.
+    """
+
+    def __init__(self, index: ProjectIndex):
+        self.index = index
+        self._lock = threading.Lock()
+        self._version = None
+        self._files: List[IndexedFile] = []
+        self._modules: Dict[str, ModuleInfo] = {}  # digest -> parsed module
+        self._by_path: Dict[str, ModuleInfo] = {}
+
+    def refresh(self):
+        files = self.index.files()  # refreshes the project index if it is stale
+        with self._lock:
+            if self.index.version == self._version:
+                return
+            modules, by_path = {}, {}
+            for f in files:
+                if not f.path.endswith('.py'):
+                    continue
+                info = self._modules.get(f.digest)
+                if info is None or info.path != f.path:
+                    info = parse_module(f.path, f.content)
+                modules[f.digest] = by_path[f.path] = info
+            self._files = sorted(files, key=lambda f: f.path)
+            self._modules, self._by_path = modules, by_path
+            self._version = self.index.version
+
+    def files(self) -> List[IndexedFile]:
+        self.refresh()
+        return self._files
+
+    def modules(self) -> List[ModuleInfo]:
+        self.refresh()
+        return list(self._by_path.values())
+
+    def tree(self) -> str:
+        """Indented file tree with sizes."""
+        files = self.files()
+        lines = [f"{len(files)} files, {_size(sum(f.size for f in files))}"]
+        shown_dirs: Set[str] = set()
+        for f in files:
+            parts = f.path.replace(os.sep, '/').split('/')
+            for depth in range(len(parts) - 1):
+                directory = '/'.join(parts[:depth + 1])
+                if directory not in shown_dirs:
+                    shown_dirs.add(directory)
+                    lines.append(f"{'  ' * depth}{parts[depth]}/")
+            lines.append(f"{'  ' * (len(parts) - 1)}{parts[-1]}  {_size(f.size)}")
+        return '\n'.join(lines)
+
+    def find_file(self, name: str) -> Optional[IndexedFile]:
+        """A file by relative path or base name."""
+        name = name.replace('\\', '/').lower()
+        for f in self.files():
+            path = f.path.replace(os.sep, '/').lower()
+            if path == name or os.path.basename(path) == name:
+                return f
+        return None
+
+    def mentioned(self, text: str) -> List[IndexedFile]:
+        """Files named in ``text`` by path or base name (with extension), e.g. "main.py"."""
+        lowered = text.lower()
+        found = []
+        for f in self.files():
+            path = f.path.replace(os.sep, '/').lower()
+            for name in (path, os.path.basename(path)):
+                if re.search(r'(?<![\w./])' + re.escape(name) + r'(?![\w/])', lowered):
+                    found.append(f)
+                    break
+        return found
+
+    def outline(self, path: str) -> str:
+        """Classes and functions of one module with line numbers, plus its imports."""
+        self.refresh()
+        info = self._by_path.get(path)
+        if info is None:
+            return ''
+        lines = []
+        if info.imports:
+            lines.append('imports: ' + ', '.join(dict.fromkeys(info.imports)))
+        for s in info.symbols:
+            if s.kind == 'function' and s.parent:
+                continue  # nested helpers
+            indent = '    ' if s.kind == 'method' else ''
+            lines.append(f"{indent}{s.line}: {s.signature}")
+        return '\n'.join(lines)
+
+    def definitions(self, name: str) -> List[Symbol]:
+        """Symbols called ``name``, or with qualified name ``name`` (e.g. 'Router.generate')."""
+        return [s for info in self.modules() for s in info.symbols if name in (s.name, s.qualname)]
+
+    def callers(self, name: str) -> List[Tuple[str, str, str]]:
+        """(path, calling function, call as written) for the calls that may reach ``name``.
+
+        Receivers are not resolved to types, so a method name matches calls on
+        any object. For a qualified ``Class.method`` calls through ``self`` or
+        ``cls`` only count inside that class.
+        """
+        owner, _, short = name.rpartition('.')
+        found = []
+        for info in self.modules():
+            for caller, called in info.calls.items():
+                for call in called:
+                    receiver, _, attr = call.rpartition('.')
+                    if attr != short:
+                        continue
+                    if owner and receiver in ('self', 'cls') and caller.split('.')[0] != owner:
+                        continue
+                    found.append((info.path, caller, call))
+        return sorted(found)
+
+    def importers(self, module: str) -> List[str]:
+        """Paths of modules that import ``module`` (matched by its last dotted component)."""
+        target = _module_name(module) if module.endswith('.py') else module.rsplit('.', 1)[-1]
+        return sorted(info.path for info in self.modules()
+                      if any(imp.rsplit('.', 1)[-1] == target for imp in info.imports))
+
+    def resolve(self, name: str) -> Optional[str]:
+        """``name`` as defined in the project, matched case-insensitively if need be; None if undefined."""
+        defined = {n for info in self.modules() for s in info.symbols for n in (s.name, s.qualname)}
+        if name in defined:
+            return name
+        return next((n for n in sorted(defined) if n.lower() == name.lower()), None)
+
+
+def _listing(lines: List[str]) -> str:
+    shown = lines[:MAX_LISTED]
+    if len(lines) > MAX_LISTED:
+        shown.append(f"... and {len(lines) - MAX_LISTED} more")
+    return '\n'.join(f"- {line}" for line in shown)
+
+
+def describe_files(structure: StructureIndex) -> str:
+    return "Project files:\n" + structure.tree()
+
+
+def describe_definitions(structure: StructureIndex, name: str) -> Optional[str]:
+    """Where the project symbol ``name`` is defined; None if the project defines no such name."""
+    name = structure.resolve(name)
+    if name is None:
+        return None
+    found = structure.definitions(name)
+    return f"{name} is defined in:\n" + _listing([f"{s.path}:{s.line} {s.signature}" for s in found])
+
+
+def describe_callers(structure: StructureIndex, name: str) -> Optional[str]:
+    """Where the project symbol ``name`` is called from; None if the project defines no such name."""
+    name = structure.resolve(name)
+    if name is None:
+        return None
+    found = structure.callers(name)
+    if not found:
+        return f"Nothing in the project calls {name}."
+    return f"{name} is called from:\n" + _listing([f"{path}: {caller} ({call})" for path, caller, call in found])
+
+
+def describe_outline(structure: StructureIndex, text: str) -> Optional[str]:
+    """Outline of the Python files named in ``text``; None if it names none."""
+    files = [f for f in structure.mentioned(text) if f.path.endswith('.py')]
+    if not files:
+        return None
+    parts = []
+    for f in files:
+        users = structure.importers(f.path)
+        parts.append(f"{f.path} ({_size(f.size)}):\n{structure.outline(f.path)}"
+                     + (f"\nimported by: {', '.join(users)}" if users else ''))
+    return '\n\n'.join(parts)
@@ -0,0 +1,520 @@
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import wave
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Union
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 'auto' tries the offline engines first and falls back to Google's web API
+STT_BACKEND = os.environ.get('FRANCIS_STT_BACKEND', 'auto')
+VOSK_MODEL_PATH = os.environ.get('FRANCIS_VOSK_MODEL', os.path.join(PROJECT_ROOT, 'models', 'vosk'))
+WHISPER_MODEL = os.environ.get('FRANCIS_WHISPER_MODEL', 'base.en')
+SAMPLE_RATE = 16000
+STT_WORKERS = int(os.environ.get('FRANCIS_STT_WORKERS', '2'))
+
+# Streaming endpointing for backends without their own incremental decoder
+MAX_UTTERANCE_SECONDS = 30
+ENDPOINT_SILENCE_MS = 700
+SILENCE_THRESHOLD = 500  # mean absolute amplitude of 16-bit samples, used without NumPy
+
+
+class TranscriptionError(Exception):
+    """Raised when audio cannot be transcribed by the configured backend."""
+
+
+def load_pcm(source: Union[str, bytes]) -> Tuple[bytes, int]:
+    """Return 16-bit mono PCM and its sample rate for an audio file path or file bytes."""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            data = f.read()
+    else:
+        data = source
+
+    # Plain mono 16-bit WAV needs no decoding at all
+    try:
+        with wave.open(io.BytesIO(data)) as wf:
+            if wf.getnchannels() == 1 and wf.getsampwidth() == 2:
+                return wf.readframes(wf.getnframes()), wf.getframerate()
+    except (wave.Error, EOFError):
+        pass
+
+    # Anything else (FLAC, AIFF, stereo WAV) goes through SpeechRecognition's decoder
+    try:
+        import speech_recognition as sr
+    except ImportError:
+        raise TranscriptionError("Unsupported audio format. Install 'speechrecognition' to decode FLAC/AIFF files.")
+    try:
+        with sr.AudioFile(io.BytesIO(data)) as src:
+            audio = sr.Recognizer().record(src)
+    except Exception as e:
+        raise TranscriptionError(f"Cannot decode audio: {e}")
+    return audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2), SAMPLE_RATE
+
+
+_vad_module = False
+
+
+def _vad():
+    """The VAD module, imported on first use (it pulls in NumPy); None without NumPy."""
+    global _vad_module
+    if _vad_module is False:
+        try:
+            import vad
+        except ImportError:
+            try:
+                from src import vad
+            except ImportError:
+                vad = None  # NumPy not installed; audio is transcribed untrimmed
+        _vad_module = vad
+    return _vad_module
+
+
+def _has_speech(pcm: bytes, sample_rate: int) -> bool:
+    vad = _vad()
+    if vad is not None:
+        return vad.is_speech(pcm, sample_rate)
+    return _frame_level(pcm) >= SILENCE_THRESHOLD
+
+
+def _frame_level(pcm: bytes) -> float:
+    """Mean absolute amplitude of a block of 16-bit little-endian PCM."""
+    samples = array('h')
+    samples.frombytes(pcm[:len(pcm) // 2 * 2])
+    if not samples:
+        return 0.0
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return sum(map(abs, samples)) / len(samples)
+
+
+class BufferedStream:
+    """Incremental front-end for backends that can only transcribe whole clips.
+
+    Leading silence is dropped, speech is buffered until enough trailing
+    silence marks the end of the utterance, and the buffer is capped at
+    MAX_UTTERANCE_SECONDS so long recordings never grow memory unbounded.
+    """
+
+    def __init__(self, backend, sample_rate: int):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self._max_bytes = int(MAX_UTTERANCE_SECONDS * sample_rate) * 2
+        self._reset()
+
+    def _reset(self):
+        self._buf = bytearray()
+        self._heard = False
+        self._silence_ms = 0.0
+
+    def _flush(self) -> str:
+        pcm = bytes(self._buf)
+        self._reset()
+        vad = _vad()
+        if vad is not None:
+            # Drop the trailing silence that triggered the endpoint
+            pcm = vad.trim(pcm, self.sample_rate)
+            if not pcm:
+                return ''
+        return self.backend.transcribe(pcm, self.sample_rate)
+
+    def accept(self, pcm: bytes) -> dict:
+        if _has_speech(pcm, self.sample_rate):
+            self._heard = True
+            self._silence_ms = 0.0
+        elif self._heard:
+            self._silence_ms += len(pcm) / 2 / self.sample_rate * 1000
+        else:
+            return {}
+        self._buf += pcm
+        if self._silence_ms >= ENDPOINT_SILENCE_MS or len(self._buf) >= self._max_bytes:
+            return {'final': self._flush()}
+        return {}
+
+    def finish(self) -> str:
+        return self._flush() if self._heard else ''
+
+
+class STTBackend:
+    """Base class for speech-to-text engines.
+
+    ``load`` is called once when the worker process starts, so expensive model
+    setup belongs there; ``transcribe`` is called for every request.
+    ``open_stream`` returns an object with ``accept(pcm) -> dict`` (``partial``
+    and/or ``final`` keys) and ``finish() -> str`` for incremental decoding.
+    """
+    name = 'base'
+
+    def load(self):
+        pass
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        raise NotImplementedError
+
+    def open_stream(self, sample_rate: int):
+        return BufferedStream(self, sample_rate)
+
+
+class StubBackend(STTBackend):
+    """Deterministic backend for tests; returns a fixed transcript."""
+    name = 'stub'
+
+    def __init__(self, text: str = None):
+        self.text = text if text is not None else os.environ.get('FRANCIS_STT_STUB_TEXT', 'hello francis')
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        return self.text if pcm else ''
+
+
+class GoogleBackend(STTBackend):
+    """Google Web Speech API via SpeechRecognition (requires network access)."""
+    name = 'google'
+
+    def load(self):
+        try:
+            import speech_recognition as sr
+        except ImportError:
+            raise TranscriptionError("Speech recognition not available. Install 'speechrecognition' to enable voice.")
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        audio = self._sr.AudioData(pcm, sample_rate, 2)
+        try:
+            return self._recognizer.recognize_google(audio)
+        except self._sr.UnknownValueError:
+            return ''
+
+
+class VoskBackend(STTBackend):
+    """Offline recognition with a local Vosk (Kaldi) model."""
+    name = 'vosk'
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        self.model_path = model_path
+
+    def load(self):
+        try:
+            import vosk
+        except ImportError:
+            raise TranscriptionError("Vosk not available. Install 'vosk' to enable offline recognition.")
+        if not os.path.isdir(self.model_path):
+            raise TranscriptionError(f"Vosk model not found at {self.model_path}")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self._model = vosk.Model(self.model_path)
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        rec = self._vosk.KaldiRecognizer(self._model, sample_rate)
+        step = sample_rate * 2  # feed one second at a time
+        for i in range(0, len(pcm), step):
+            rec.AcceptWaveform(pcm[i:i + step])
+        return json.loads(rec.FinalResult()).get('text', '')
+
+    def open_stream(self, sample_rate: int):
+        return VoskStream(self._vosk.KaldiRecognizer(self._model, sample_rate))
+
+
+class VoskStream:
+    """Vosk decodes incrementally and does its own endpointing."""
+
+    def __init__(self, recognizer):
+        self.rec = recognizer
+
+    def accept(self, pcm: bytes) -> dict:
+        if self.rec.AcceptWaveform(pcm):
+            return {'final': json.loads(self.rec.Result()).get('text', '')}
+        return {'partial': json.loads(self.rec.PartialResult()).get('partial', '')}
+
+    def finish(self) -> str:
+        return json.loads(self.rec.FinalResult()).get('text', '')
+
+
+class WhisperCppBackend(STTBackend):
+    """Offline recognition with whisper.cpp through the pywhispercpp bindings."""
+    name = 'whisper'
+
+    def __init__(self, model: str = WHISPER_MODEL):
+        self.model_name = model
+
+    def load(self):
+        try:
+            import numpy as np
+            from pywhispercpp.model import Model
+        except ImportError:
+            raise TranscriptionError("whisper.cpp not available. Install 'pywhispercpp' and 'numpy'.")
+        self._np = np
+        self._model = Model(self.model_name, print_progress=False, print_realtime=False)
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        np = self._np
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        if sample_rate != SAMPLE_RATE and len(samples):
+            # whisper expects 16 kHz; linear resampling is adequate for speech
+            n = int(len(samples) * SAMPLE_RATE / sample_rate)
+            samples = np.interp(np.linspace(0, len(samples) - 1, n), np.arange(len(samples)), samples).astype(np.float32)
+        segments = self._model.transcribe(samples)
+        return ' '.join(s.text.strip() for s in segments).strip()
+
+
+BACKENDS = {
+    'stub': StubBackend,
+    'google': GoogleBackend,
+    'vosk': VoskBackend,
+    'whisper': WhisperCppBackend,
+}
+
+AUTO_ORDER = ('vosk', 'whisper', 'google')
+
+
+def create_backend(name: str = STT_BACKEND) -> STTBackend:
+    """Instantiate and load a backend by name. 'auto' picks the first one that loads."""
+    if name == 'auto':
+        errors = []
+        for candidate in AUTO_ORDER:
+            try:
+                return create_backend(candidate)
+            except TranscriptionError as e:
+                errors.append(str(e))
+        raise TranscriptionError('No speech recognition backend available: ' + '; '.join(errors))
+    if name not in BACKENDS:
+        raise TranscriptionError(f"Unknown speech recognition backend '{name}'")
+    backend = BACKENDS[name]()
+    backend.load()
+    return backend
+
+
+def _worker_main(conn, backend_name: str):
+    """Entry point of the STT process: load the backend once, then serve requests."""
+    try:
+        backend = create_backend(backend_name)
+    except Exception as e:
+        conn.send((False, str(e)))
+        return
+    conn.send((True, backend.name))
+
+    streams = {}
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        op, args = msg
+        try:
+            if op == 'transcribe':
+                conn.send((True, backend.transcribe(*args)))
+            elif op == 'open':
+                sid, rate = args
+                streams[sid] = backend.open_stream(rate)
+                conn.send((True, sid))
+            elif op == 'feed':
+                sid, pcm = args
+                conn.send((True, streams[sid].accept(pcm)))
+            elif op == 'finish':
+                conn.send((True, streams[args[0]].finish()))
+            elif op == 'close':
+                streams.pop(args[0], None)
+                conn.send((True, None))
+            else:
+                conn.send((False, f"Unknown operation '{op}'"))
+        except KeyError:
+            conn.send((False, 'Unknown audio stream (worker restarted?)'))
+        except Exception as e:
+            conn.send((False, str(e)))
+    conn.close()
+
+
+class WorkerStream:
+    """Handle for an incremental recognizer living inside the worker process."""
+
+    def __init__(self, worker, sid: int):
+        self.worker = worker
+        self.sid = sid
+
+    def accept(self, pcm: bytes) -> dict:
+        return self.worker._call('feed', self.sid, pcm)
+
+    def finish(self) -> str:
+        return self.worker._call('finish', self.sid)
+
+    def close(self):
+        try:
+            self.worker._call('close', self.sid)
+        except TranscriptionError:
+            pass
+
+
+class STTWorker:
+    """Persistent process that keeps one backend loaded across requests.
+
+    Calls are serialized over a pipe; the process is (re)started lazily, so a
+    crash in a native recognizer only costs the next request a reload.
+    """
+
+    def __init__(self, backend_name: str = STT_BACKEND):
+        self.backend_name = backend_name
+        self.loaded_backend = None
+        self._ctx = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        self._proc = None
+        self._conn = None
+        self._stream_ids = itertools.count(1)
+
+    def _start(self):
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child, self.backend_name), daemon=True)
+        proc.start()
+        child.close()
+        try:
+            ok, info = parent.recv()
+        except EOFError:
+            ok, info = False, 'Speech recognition worker exited during startup'
+        if not ok:
+            proc.join(timeout=1)
+            parent.close()
+            raise TranscriptionError(info)
+        self._proc, self._conn, self.loaded_backend = proc, parent, info
+
+    def start(self):
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                self._start()
+
+    def _call(self, op: str, *args):
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                self._start()
+            try:
+                self._conn.send((op, args))
+                ok, result = self._conn.recv()
+            except (EOFError, OSError):
+                self._proc = None
+                raise TranscriptionError('Speech recognition worker exited unexpectedly')
+        if not ok:
+            raise TranscriptionError(result)
+        return result
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        return self._call('transcribe', pcm, sample_rate)
+
+    def open_stream(self, sample_rate: int = SAMPLE_RATE) -> WorkerStream:
+        return WorkerStream(self, self._call('open', next(self._stream_ids), sample_rate))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except OSError:
+                    pass
+                self._conn.close()
+            if self._proc is not None:
+                self._proc.join(timeout=2)
+                if self._proc.is_alive():
+                    self._proc.terminate()
+            self._proc = None
+            self._conn = None
+
+
+class WorkerPool:
+    """A few STT workers so long recordings can be transcribed segment by segment in parallel.
+
+    Requests go to an idle worker when there is one; extra processes are only
+    started (and their models loaded) once the first one is busy.
+    """
+
+    def __init__(self, size: int = STT_WORKERS, backend_name: str = STT_BACKEND):
+        self.workers = [STTWorker(backend_name) for _ in range(max(1, size))]
+        self._rr = itertools.count()
+
+    def _pick(self) -> STTWorker:
+        for worker in self.workers:
+            if not worker._lock.locked():
+                return worker
+        return self.workers[next(self._rr) % len(self.workers)]
+
+    def start(self, count: int = None):
+        """Start the first ``count`` workers now (all of them by default); the rest start on demand."""
+        for worker in self.workers[:count]:
+            worker.start()
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        return self._pick().transcribe(pcm, sample_rate)
+
+    def transcribe_many(self, segments: List[bytes], sample_rate: int) -> List[str]:
+        """Transcribe independent segments concurrently, preserving their order."""
+        if len(segments) == 1:
+            return [self.transcribe(segments[0], sample_rate)]
+        n = len(self.workers)
+        with ThreadPoolExecutor(max_workers=min(n, len(segments))) as ex:
+            futures = [ex.submit(self.workers[i % n].transcribe, seg, sample_rate) for i, seg in enumerate(segments)]
+            return [f.result() for f in futures]
+
+    def open_stream(self, sample_rate: int = SAMPLE_RATE) -> WorkerStream:
+        return self._pick().open_stream(sample_rate)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    """Return the shared worker pool for the configured backend."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+
+def warm():
+    """Start one worker and load its model in the background; more start when it is busy."""
+    def _warm():
+        try:
+            get_pool().start(1)
+        except TranscriptionError:
+            pass
+    threading.Thread(target=_warm, daemon=True).start()
+
+
+def speech_segments(pcm: bytes, sample_rate: int) -> List[bytes]:
+    """Split audio into speech segments with silence removed (whole clip if NumPy is missing)."""
+    vad = _vad()
+    if vad is None:
+        return [pcm] if pcm else []
+    return vad.split(pcm, sample_rate)
+
+
+def transcribe(source: Union[str, bytes]) -> str:
+    """Transcribe an audio file path or file bytes with the shared workers."""
+    pcm, rate = load_pcm(source)
+    segments = speech_segments(pcm, rate)
+    if not segments:
+        return ''
+    texts = get_pool().transcribe_many(segments, rate)
+    return ' '.join(t for t in texts if t)
+
+
+def open_stream(sample_rate: int = SAMPLE_RATE) -> WorkerStream:
+    """Open an incremental recognizer for raw 16-bit mono PCM frames."""
+    return get_pool().open_stream(sample_rate)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
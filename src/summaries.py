@@ -0,0 +1,224 @@
+import ast
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from store import DB_PATH, connect
+except ImportError:
+    from src.store import DB_PATH, connect
+
+# Longest outline kept per file
+MAX_SUMMARY_CHARS = 1500
+# Files shorter than this are cheaper to include whole than to describe
+MIN_SYNOPSIS_CHARS = 2000
+SYNOPSIS_PROMPT = (
+    "Describe in one or two sentences what this file does and how it fits in its project. "
+    "Answer with the description only.\n\nFile: {path}\nOutline:\n{outline}\n\nStart of file:\n{head}\n\nDescription:"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_summaries (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    outline TEXT NOT NULL,
+    synopsis TEXT,
+    created REAL NOT NULL
+);
+"""
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8', errors='replace')).hexdigest()
+
+
+def _first_line(doc: Optional[str]) -> str:
+    return doc.strip().splitlines()[0].strip() if doc and doc.strip() else ''
+
+
+def _signature(node) -> str:
+    prefix = 'async def' if isinstance(node, ast.AsyncFunctionDef) else 'def'
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ''
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def outline_python(content: str) -> str:
+    """Module docstring, constants, classes and function signatures with their first docstring lines."""
+    tree = ast.parse(content)
+    lines = []
+    doc = _first_line(ast.get_docstring(tree))
+    if doc:
+        lines.append(doc)
+    constants = [t.id for node in tree.body if isinstance(node, ast.Assign)
+                 for t in node.targets if isinstance(t, ast.Name) and t.id.isupper()]
+    if constants:
+        lines.append('constants: ' + ', '.join(constants))
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            bases = ', '.join(ast.unparse(b) for b in node.bases)
+            doc = _first_line(ast.get_docstring(node))
+            lines.append(f"class {node.name}({bases})" + (f": {doc}" if doc else ''))
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and (
+                        not item.name.startswith('_') or item.name == '__init__'):
+                    doc = _first_line(ast.get_docstring(item))
+                    lines.append(f"    {_signature(item)}" + (f": {doc}" if doc else ''))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            doc = _first_line(ast.get_docstring(node))
+            lines.append(_signature(node) + (f": {doc}" if doc else ''))
+    return '\n'.join(lines)
+
+
+def outline_markdown(content: str) -> str:
+    """Headings, each with the first line of text under it."""
+    lines = []
+    want_text = False
+    for line in content.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            lines.append(stripped)
+            want_text = True
+        elif want_text and stripped and not stripped.startswith('```'):
+            lines.append('  ' + stripped[:160])
+            want_text = False
+    return '\n'.join(lines)
+
+
+def outline_json(content: str) -> str:
+    """Top-level shape of a JSON document."""
+    data = json.loads(content)
+    if isinstance(data, dict):
+        return 'object with keys: ' + ', '.join(list(map(str, data))[:40])
+    if isinstance(data, list):
+        return f"array of {len(data)} items"
+    return type(data).__name__
+
+
+OUTLINERS: Dict[str, Callable[[str], str]] = {
+    '.py': outline_python,
+    '.md': outline_markdown,
+    '.json': outline_json,
+}
+
+
+def outline(path: str, content: str) -> str:
+    """Heuristic summary of a file from its structure; falls back to its first lines."""
+    ext = path[path.rfind('.'):].lower() if '.' in path else ''
+    text = ''
+    outliner = OUTLINERS.get(ext)
+    if outliner is not None:
+        try:
+            text = outliner(content)
+        except (SyntaxError, ValueError, RecursionError):
+            text = ''
+    if not text:
+        text = '\n'.join(content.splitlines()[:10])
+    lines = content.count('\n') + 1
+    text = f"({lines} lines) " + text
+    return text if len(text) <= MAX_SUMMARY_CHARS else text[:MAX_SUMMARY_CHARS - 4] + ' ...'
+
+
+class SummaryCache:
+    """Per-file summaries keyed by content hash, so unchanged files are never summarized twice.
+
+    Outlines are computed on first request (milliseconds); the optional model
+    synopsis is filled in by ``summarize_pending`` in the background.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self._lock = threading.Lock()
+        self._memo: Dict[str, str] = {}
+        try:
+            self._conn = connect(path)
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        except (OSError, sqlite3.Error):
+            self._conn = None  # summaries still work, just without persistence
+
+    def _row(self, digest: str):
+        if self._conn is None:
+            return None
+        return self._conn.execute('SELECT outline, synopsis FROM file_summaries WHERE hash = ?', (digest,)).fetchone()
+
+    def summary(self, path: str, content: str, digest: str = None) -> str:
+        digest = digest or content_hash(content)
+        with self._lock:
+            cached = self._memo.get(digest)
+            if cached is not None:
+                return cached
+            row = self._row(digest)
+            if row is None:
+                text = outline(path, content)
+                if self._conn is not None:
+                    with self._conn:
+                        self._conn.execute('INSERT OR IGNORE INTO file_summaries (hash, path, outline, created) '
+                                           'VALUES (?, ?, ?, ?)', (digest, path, text, time.time()))
+            else:
+                text = f"{row['synopsis']}\n{row['outline']}" if row['synopsis'] else row['outline']
+            self._memo[digest] = text
+            return text
+
+    def summary_for(self, f) -> str:
+        """Summary of an IndexedFile; its content is only read if the summary is not cached yet."""
+        with self._lock:
+            cached = self._memo.get(f.digest)
+        return cached if cached is not None else self.summary(f.path, f.content, f.digest)
+
+    def summarize_pending(self, files, complete: Callable[[str], str], limit: int = 20,
+                          busy: Callable[[], bool] = None) -> int:
+        """Add a model synopsis to up to ``limit`` large files that lack one; returns how many were added.
+
+        Stops early once ``busy()`` is true, leaving the rest for the next run.
+        """
+        done = 0
+        for f in files:
+            if done >= limit:
+                break
+            if f.size < MIN_SYNOPSIS_CHARS:
+                continue
+            digest = f.digest
+            self.summary_for(f)
+            with self._lock:
+                row = self._row(digest)
+            if self._conn is None or row is None or row['synopsis']:
+                continue
+            if busy is not None and busy():
+                break  # interactive requests share the model host; resume on the next run
+            synopsis = complete(SYNOPSIS_PROMPT.format(path=f.path, outline=row['outline'],
+                                                       head=f.content[:1500])).strip()
+            if not synopsis or synopsis.startswith('Error:'):
+                break  # model unavailable; try again on the next run
+            synopsis = re.sub(r'\s+', ' ', synopsis)[:400]
+            with self._lock, self._conn:
+                self._conn.execute('UPDATE file_summaries SET synopsis = ? WHERE hash = ?', (synopsis, digest))
+                self._memo[digest] = f"{synopsis}\n{row['outline']}"
+            done += 1
+        return done
+
+    def prune(self, live_hashes: List[str]):
+        """Forget summaries of content that no longer exists in the index."""
+        if self._conn is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute('CREATE TEMP TABLE IF NOT EXISTS live (hash TEXT PRIMARY KEY)')
+            self._conn.execute('DELETE FROM live')
+            self._conn.executemany('INSERT OR IGNORE INTO live VALUES (?)', [(h,) for h in live_hashes])
+            self._conn.execute('DELETE FROM file_summaries WHERE hash NOT IN (SELECT hash FROM live)')
+            live = set(live_hashes)
+            self._memo = {h: s for h, s in self._memo.items() if h in live}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache()
+        return _cache
@@ -0,0 +1,91 @@
+import numpy as np
+from typing import List, Tuple
+
+# Frame-energy voice activity detection for 16-bit mono PCM
+FRAME_MS = 30
+ENERGY_FLOOR_DB = -50.0   # frames quieter than this are never speech
+MARGIN_DB = 10.0          # speech must rise this far above the noise floor
+MIN_SPEECH_MS = 150       # shorter bursts (clicks, pops) are dropped
+MIN_SILENCE_MS = 400      # shorter pauses stay inside one segment
+PAD_MS = 150              # context kept around each speech region
+MAX_SEGMENT_SECONDS = 20  # long regions are split so they can be transcribed in parallel
+
+
+def to_samples(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype='<i2')
+
+
+def frame_energy(samples: np.ndarray, sample_rate: int, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """Per-frame energy in dBFS."""
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n = len(samples) // frame_len
+    if n == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[:n * frame_len].reshape(n, frame_len).astype(np.float32) / 32768.0
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def speech_mask(energy: np.ndarray) -> np.ndarray:
+    """Classify frames as speech against an adaptive noise-floor threshold."""
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+    noise = np.percentile(energy, 10)
+    peak = energy.max()
+    # Clips that are speech throughout have a high "noise floor"; cap the threshold below the peak
+    threshold = max(ENERGY_FLOOR_DB, min(noise + MARGIN_DB, peak - MARGIN_DB))
+    return energy > threshold
+
+
+def _runs(mask: np.ndarray, value: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Start (inclusive) and end (exclusive) indices of runs equal to ``value``."""
+    padded = np.concatenate(([False], mask == value, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[0::2], edges[1::2]
+
+
+def speech_regions(pcm: bytes, sample_rate: int) -> List[Tuple[int, int]]:
+    """Return (start, end) byte offsets of the speech regions in ``pcm``."""
+    samples = to_samples(pcm)
+    frame_len = max(1, sample_rate * FRAME_MS // 1000)
+    mask = speech_mask(frame_energy(samples, sample_rate))
+
+    # Bridge short pauses, then drop bursts too short to be words
+    starts, ends = _runs(mask, False)
+    inner = (starts > 0) & (ends < len(mask)) & (ends - starts < MIN_SILENCE_MS // FRAME_MS)
+    for s, e in zip(starts[inner], ends[inner]):
+        mask[s:e] = True
+    starts, ends = _runs(mask, True)
+    keep = ends - starts >= max(1, MIN_SPEECH_MS // FRAME_MS)
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return []
+
+    pad = sample_rate * PAD_MS // 1000
+    starts = np.maximum(starts * frame_len - pad, 0)
+    ends = np.minimum(ends * frame_len + pad, len(samples))
+
+    max_len = MAX_SEGMENT_SECONDS * sample_rate
+    regions = []
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        for chunk in range(s, e, max_len):
+            regions.append((chunk * 2, min(chunk + max_len, e) * 2))
+    return regions
+
+
+def split(pcm: bytes, sample_rate: int) -> List[bytes]:
+    """Split audio into speech segments, dropping the silence between them."""
+    return [pcm[s:e] for s, e in speech_regions(pcm, sample_rate)]
+
+
+def trim(pcm: bytes, sample_rate: int) -> bytes:
+    """Strip leading and trailing silence."""
+    regions = speech_regions(pcm, sample_rate)
+    if not regions:
+        return b''
+    return pcm[regions[0][0]:regions[-1][1]]
+
+
+def is_speech(pcm: bytes, sample_rate: int, threshold_db: float = ENERGY_FLOOR_DB + MARGIN_DB) -> bool:
+    """Cheap check used by streaming endpointing: does any frame in this block carry speech?"""
+    energy = frame_energy(to_samples(pcm), sample_rate, frame_ms=10)
+    return bool(len(energy)) and bool((energy > threshold_db).any())
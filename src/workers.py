@@ -0,0 +1,201 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Both GUIs share one bounded pool instead of a thread per action
+MAX_WORKERS = 4
+
+
+class CancelToken:
+    """Cooperative cancellation flag shared between a job and whoever submitted it.
+
+    With a ``timeout`` the token also reads as cancelled once its deadline has
+    passed. Callbacks registered with ``on_cancel`` run when ``cancel`` is
+    called, on the cancelling thread; the engine uses them to close the
+    upstream Ollama connection a job is blocked reading from.
+    """
+
+    def __init__(self, timeout: float = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+
+    @property
+    def cancel_requested(self) -> bool:
+        """True once ``cancel`` was called; a passed deadline alone does not count."""
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self.expired
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None without one)."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def on_cancel(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Run ``fn`` when the token is cancelled (now, if it already was); returns a function that unregisters it."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return lambda: self._discard(fn)
+        fn()
+        return lambda: None
+
+    def _discard(self, fn):
+        with self._lock:
+            if fn in self._callbacks:
+                self._callbacks.remove(fn)
+
+
+class Job:
+    """Handle for a submitted task."""
+
+    def __init__(self, future, token: CancelToken):
+        self.future = future
+        self.token = token
+
+    def cancel(self):
+        # A queued job never starts; a running one has its result dropped
+        self.token.cancel()
+        self.future.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def done(self) -> bool:
+        return self.future.done()
+
+
+class UIDispatcher:
+    """Thread-safe queue of callbacks that the UI thread drains in one batch per tick."""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def post(self, fn: Callable, *args):
+        self._queue.put((fn, args))
+
+    def drain(self):
+        while True:
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                fn(*args)
+            except Exception:
+                pass
+
+
+class WorkerService:
+    """Bounded executor with cancellable jobs and results delivered on the UI thread.
+
+    Jobs submitted with a ``key`` replace any in-flight job with the same key,
+    so pressing Send again cancels the previous generation.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, dispatcher: UIDispatcher = None):
+        self.dispatcher = dispatcher or UIDispatcher()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='francis')
+        self._lock = threading.Lock()
+        self._keyed: Dict[str, Job] = {}
+        self._jobs = set()
+
+    def submit(self, fn: Callable, *args, callback: Callable = None, key: str = None,
+               with_token: bool = False, timeout: float = None) -> Job:
+        """Run ``fn(*args)`` in the pool and deliver its result to ``callback`` on the UI thread.
+
+        With ``with_token`` the job's CancelToken is passed as the last argument;
+        ``timeout`` gives that token a deadline, counted from submission.
+        Exceptions are delivered as an ``"Error: ..."`` string, like the old workers did.
+        """
+        token = CancelToken(timeout)
+
+        # A job that ran out of time still delivers what it produced; only cancel() drops results
+        def deliver(result):
+            if not token.cancel_requested:
+                callback(result)
+
+        def run():
+            if token.cancel_requested:
+                return
+            try:
+                result = fn(*args, token) if with_token else fn(*args)
+            except Exception as e:
+                result = f"Error: {e}"
+            if callback is not None and not token.cancel_requested:
+                self.dispatcher.post(deliver, result)
+
+        with self._lock:
+            if key is not None and key in self._keyed:
+                self._keyed[key].cancel()
+            job = Job(self._executor.submit(run), token)
+            self._jobs.add(job)
+            if key is not None:
+                self._keyed[key] = job
+        job.future.add_done_callback(lambda _f: self._forget(job, key))
+        return job
+
+    def to_ui(self, fn: Callable) -> Callable:
+        """Wrap ``fn`` so calls from worker threads are run on the UI thread instead."""
+        return lambda *args: self.dispatcher.post(fn, *args)
+
+    def _forget(self, job: Job, key: str):
+        with self._lock:
+            self._jobs.discard(job)
+            if key is not None and self._keyed.get(key) is job:
+                del self._keyed[key]
+
+    def cancel(self, key: str) -> bool:
+        """Cancel the in-flight job registered under ``key``; True if there was one."""
+        with self._lock:
+            job = self._keyed.pop(key, None)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = list(self._jobs)
+            self._keyed.clear()
+        for job in jobs:
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> WorkerService:
+    """Return the process-wide worker service."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WorkerService()
+        return _service
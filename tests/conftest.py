@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the modules as the ``src`` package, like app.py is run
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
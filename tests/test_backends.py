@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.backends import Backend, Router
+from src.workers import CancelToken
+
+FIRST_CHUNK_DELAY = 2.0
+
+
+class SlowOllama(BaseHTTPRequestHandler):
+    """Streams two chunks after FIRST_CHUNK_DELAY, sending headers first or only with the first chunk."""
+
+    protocol_version = 'HTTP/1.1'
+    headers_first = False
+    aborted = None
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.flush()
+
+    def _chunk(self, obj):
+        line = (json.dumps(obj) + '\n').encode()
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+        self.wfile.flush()
+
+    def do_GET(self):
+        body = json.dumps({'models': [{'name': 'm'}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers_first:
+            self._headers()
+        time.sleep(FIRST_CHUNK_DELAY)
+        try:
+            if not self.headers_first:
+                self._headers()
+            for done in (False, True):
+                self._chunk({'response': 'hi', 'done': done})
+                time.sleep(0.2)
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.aborted.set()
+
+
+@pytest.fixture(params=[False, True], ids=['headers-with-first-chunk', 'headers-first'])
+def server(request):
+    handler = type('Handler', (SlowOllama,), {'headers_first': request.param, 'aborted': threading.Event()})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd, handler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_cancel_before_first_chunk(server):
+    httpd, handler = server
+    router = Router([Backend(f"http://127.0.0.1:{httpd.server_address[1]}")], {'default': 'm'})
+    token = CancelToken()
+    chunks = []
+    reader = threading.Thread(target=lambda: chunks.extend(router.generate({'model': 'm'}, token)))
+    started = time.monotonic()
+    reader.start()
+    time.sleep(0.3)
+    token.cancel()
+    reader.join(FIRST_CHUNK_DELAY)
+    assert not reader.is_alive()
+    assert time.monotonic() - started < 1.0
+    assert chunks == []
+    # The server notices the disconnect when it next writes
+    assert handler.aborted.wait(FIRST_CHUNK_DELAY + 1)
+
+
+def test_stream_without_cancel(server):
+    httpd, _handler = server
+    router = Router([Backend(f"http://127.0.0.1:{httpd.server_address[1]}")], {'default': 'm'})
+    assert [c['done'] for c in router.generate({'model': 'm'})] == [False, True]
@@ -0,0 +1,49 @@
+import pytest
+
+from src import engine
+from src.project_index import ProjectIndex
+from src.structure import StructureIndex
+from src.summaries import SummaryCache
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    root = tmp_path / 'repo'
+    root.mkdir()
+    (root / 'README.md').write_text('# Demo\n')
+    (root / 'main.py').write_text('def main():\n    """Start the app."""\n    return run()\n')
+    (root / 'cli.py').write_text('import sys\n\n\ndef run():\n    return sys.argv\n')
+    index = ProjectIndex(str(root))
+    monkeypatch.setattr(engine, 'project_index', index)
+    monkeypatch.setattr(engine, 'structure_index', StructureIndex(index))
+    monkeypatch.setattr(engine, 'get_summary_cache', lambda: SummaryCache(str(tmp_path / 'f.db')))
+    return index
+
+
+@pytest.mark.parametrize('query', [
+    "help me understand main.py in this project",
+    "fix the bug in main.py in my repo",
+])
+def test_named_files_are_sent_whole(project, query):
+    context = engine._context_for([], query=query)
+    assert context['main.py'] == project.get('main.py').content
+    assert 'cli.py' not in context and 'cli.py (summary)' not in context
+
+
+def test_overview_summarizes_other_files(project):
+    context = engine._context_for([], query="give me an overview of the project and main.py")
+    assert '(file tree)' in context
+    assert context['main.py'] == project.get('main.py').content
+    assert 'cli.py (summary)' in context and 'cli.py' not in context
+
+
+@pytest.mark.parametrize('query, broad', [
+    ("explain the project structure", True),
+    ("how is the codebase organized", True),
+    ("what does this repo do", True),
+    ("what is in this project's main.py", False),
+    ("fix the data structure in cli.py", False),
+    ("the repo fails to build", False),
+])
+def test_broad_wording(query, broad):
+    assert engine.is_broad(query, []) is broad
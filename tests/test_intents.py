@@ -0,0 +1,59 @@
+import pytest
+
+from src import intents, structure
+from src.project_index import ProjectIndex
+from src.structure import StructureIndex
+
+
+@pytest.mark.parametrize('text, name', [
+    ("what time is it", 'time'),
+    ("what's the date today", 'date'),
+    ("list devices", 'devices'),
+    ("status", 'status'),
+    ("help", 'help'),
+    ("what files are in this project", 'files'),
+    ("project file tree", 'files'),
+    ("where is Router.generate defined", 'definition'),
+    ("where is the class SessionStore defined?", 'definition'),
+    ("find function warm", 'definition'),
+    ("what calls refresh", 'callers'),
+    ("who uses _called_name", 'callers'),
+    ("where is describe_files used", 'callers'),
+    ("outline main.py", 'outline'),
+    ("what functions are in src/engine.py", 'outline'),
+])
+def test_commands(text, name):
+    intent = intents.classify(text)
+    assert intent is not None and intent.name == name
+
+
+@pytest.mark.parametrize('text', [
+    "definition of done",
+    "source code please",
+    "what calls for a rewrite of this module and why",
+    "how do I run the tests?",
+    "explain the project structure in detail please",
+])
+def test_not_commands(text):
+    intent = intents.classify(text)
+    assert intent is None or intent.name not in ('definition', 'callers')
+
+
+@pytest.mark.parametrize('text, name, arg', [
+    ("what calls refresh", 'callers', 'refresh'),
+    ("where is Router.generate defined", 'definition', 'Router.generate'),
+    ("where is the function describe_files defined", 'definition', 'describe_files'),
+    ("callers of ProjectIndex.refresh", 'callers', 'ProjectIndex.refresh'),
+])
+def test_argument(text, name, arg):
+    assert intents.classify(text).argument(text) == arg
+
+
+def test_structure_handlers(tmp_path, monkeypatch):
+    (tmp_path / 'app.py').write_text('def what():\n    calls()\n\n\ndef calls():\n    refresh()\n\n\n'
+                                     'def refresh():\n    pass\n')
+    index = StructureIndex(ProjectIndex(str(tmp_path)))
+    monkeypatch.setattr(intents, '_structure', lambda: (index, structure))
+    assert intents.handle("what calls refresh") == "refresh is called from:\n- app.py: calls (refresh)"
+    assert intents.handle("where is refresh defined") == "refresh is defined in:\n- app.py:9 def refresh()"
+    assert intents.handle("what calls missing") is None
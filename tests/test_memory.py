@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from src.memory import MemoryStore, SUMMARY_AGE, extract_facts
+from src.store import SCHEMA, connect
+
+
+@pytest.mark.parametrize('prompt, facts', [
+    ("My name is Ayden.", ["Their name is Ayden"]),
+    ("Remember that the staging server is box2.", ["The user said: the staging server is box2"]),
+    ("Please remember: deploys happen on Fridays.", ["The user said: deploys happen on Fridays"]),
+    ("I prefer tabs over spaces.", ["They prefer tabs over spaces"]),
+    ("ok, call me Boss", ["They like to be called Boss"]),
+    ("I work at Acme. How do I fix this?", ["They work at Acme"]),
+    ("My favorite editor is vim", ["Their favorite editor is vim"]),
+])
+def test_extracts_statements(prompt, facts):
+    assert extract_facts(prompt) == facts
+
+
+@pytest.mark.parametrize('prompt', [
+    "Do you remember how to run the tests?",
+    "I don't remember what this function does",
+    "I do not remember that at all",
+    "I am getting a KeyError in app.py",
+    "my code is broken, can you help?",
+    "My code is broken",
+    "What is my name?",
+    "remember how to run tests",
+    "My name is not important",
+    "Can you remember that I prefer tabs",
+    "The docs say I prefer nothing",
+])
+def test_rejects_questions_negations_and_complaints(prompt):
+    assert extract_facts(prompt) == []
+
+
+def _store_with_turns(tmp_path, prompts, age=0.0):
+    path = str(tmp_path / 'francis.db')
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    with conn:
+        for i, prompt in enumerate(prompts):
+            conn.execute('INSERT INTO turns (session, created, prompt, response) VALUES (?, ?, ?, ?)',
+                         (f's{i}', time.time() - age, prompt, 'ok'))
+    conn.close()
+    return MemoryStore(path)
+
+
+def test_update_keeps_facts_and_recalls_them(tmp_path):
+    store = _store_with_turns(tmp_path, ["My name is Ayden.", "Do you remember my name?"])
+    assert store.update() == 1
+    assert store.recall("what is my name") == ["Their name is Ayden"]
+
+
+def test_update_skips_summaries_while_busy(tmp_path):
+    store = _store_with_turns(tmp_path, ["first", "second"], age=SUMMARY_AGE + 60)
+    calls = []
+
+    def summarize(text):
+        calls.append(text)
+        return "NONE"
+
+    store.update(summarize, busy=lambda: True)
+    assert calls == []
+    # The skipped turns are summarized once the load is gone
+    store.update(summarize, busy=lambda: False)
+    assert len(calls) == 2
+
+
+def test_update_does_not_resummarize_when_busy_mid_batch(tmp_path):
+    store = _store_with_turns(tmp_path, ["I like tea", "I like coffee"], age=SUMMARY_AGE + 60)
+    calls = []
+
+    def summarize(text):
+        calls.append(text)
+        return f"User likes tea {len(calls)}"
+
+    assert store.update(summarize, busy=lambda: len(calls) >= 1) == 1
+    assert store.update(summarize, busy=lambda: False) == 1
+    summaries = sorted(m['text'] for m in store.all() if m['kind'] == 'summary')
+    assert summaries == ["User likes tea 1", "User likes tea 2"]
+    assert len(calls) == 2
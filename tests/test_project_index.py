@@ -0,0 +1,42 @@
+from src.prefetch import ContextPrefetcher
+from src.project_index import ProjectIndex
+
+
+def _index(tmp_path):
+    (tmp_path / 'a.py').write_text('class Router:\n    pass\n')
+    (tmp_path / 'b.md').write_text('# Notes\nThe router picks a host.\n')
+    return ProjectIndex(str(tmp_path))
+
+
+def test_search_is_case_insensitive(tmp_path):
+    index = _index(tmp_path)
+    assert sorted(f.path for f in index.search('ROUTER')) == ['a.py', 'b.md']
+    assert [f.path for f in index.search('picks a')] == ['b.md']
+    assert index.search_many(['', 'missing']) == [[], []]
+
+
+def test_prefetch_matches_like_search(tmp_path):
+    prefetcher = ContextPrefetcher(_index(tmp_path))
+    assert sorted(f.path for f in prefetcher.matches('Rout')) == ['a.py', 'b.md']
+    assert [f.path for f in prefetcher.matches('Router:')] == ['a.py']
+
+
+def test_reader_keeps_contents_in_the_shared_database(tmp_path):
+    from src.shared import SharedIndex
+    from src.workers import CancelToken
+    root = tmp_path / 'repo'
+    root.mkdir()
+    (root / 'a.py').write_text('class Router:\n    pass\n')
+    (root / 'b.md').write_text('# Notes\nThe router picks a host.\n')
+    shared = SharedIndex(str(tmp_path / 'f.db'))
+    writer = ProjectIndex(str(root), shared=shared)
+    assert len(writer.files()) == 2
+    reader = ProjectIndex(str(root), shared=shared, is_writer=lambda: False)
+    files = reader.files()
+    assert not any(f.in_memory for f in files)
+    assert reader.get('a.py').content == 'class Router:\n    pass\n'
+    assert sorted(f.path for f in reader.search('ROUTER')) == ['a.py', 'b.md']
+    assert [f.path for f in ContextPrefetcher(reader).matches('picks A')] == ['b.md']
+    token = CancelToken()
+    token.cancel()
+    assert reader.matches('router', token=token) is None
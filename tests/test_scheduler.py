@@ -0,0 +1,46 @@
+import threading
+import time
+
+from src.scheduler import InteractiveLoad
+from src.shared import SharedLoad
+
+
+def _eventually(check, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_busy_counts_requests_in_other_workers(tmp_path):
+    path = str(tmp_path / 'f.db')
+    chat, writer = InteractiveLoad(SharedLoad(path)), InteractiveLoad(SharedLoad(path))
+    assert not writer.busy()
+    with chat.track():
+        assert chat.busy()
+        assert _eventually(writer.busy)
+        done = []
+        waiter = threading.Thread(target=lambda: done.append(writer.wait_idle(5.0)))
+        waiter.start()
+    assert _eventually(lambda: not writer.busy())
+    waiter.join()
+    assert done == [True]
+    chat.close()
+    writer.close()
+
+
+def test_rows_of_dead_workers_expire(tmp_path):
+    path = str(tmp_path / 'f.db')
+    SharedLoad(path).report(3)  # a worker that never reports again
+    assert InteractiveLoad(SharedLoad(path, ttl=60)).busy()
+    assert not InteractiveLoad(SharedLoad(path, ttl=0)).busy()
+
+
+def test_wait_idle_gives_up_after_timeout():
+    load = InteractiveLoad()
+    with load.track():
+        started = time.monotonic()
+        assert not load.wait_idle(0.1)
+        assert time.monotonic() - started < 1.0
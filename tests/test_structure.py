@@ -0,0 +1,85 @@
+import pytest
+
+from src import structure
+from src.project_index import ProjectIndex
+from src.structure import StructureIndex, parse_module
+
+INDEX_PY = '''\
+import re
+from os import path
+
+
+class ProjectIndex:
+    def refresh(self):
+        return path.join('a', 'b')
+
+    def files(self):
+        self.refresh()
+        return []
+
+    def search(self, query):
+        return re.search(query, '')
+
+
+def build(index):
+    index.refresh()
+    return index.search('x')
+'''
+
+VIEW_PY = '''\
+from index import ProjectIndex, build
+
+
+class View:
+    def refresh(self):
+        self.refresh()
+        return build(ProjectIndex())
+'''
+
+
+@pytest.fixture
+def index(tmp_path):
+    (tmp_path / 'index.py').write_text(INDEX_PY)
+    (tmp_path / 'view.py').write_text(VIEW_PY)
+    (tmp_path / 'README.md').write_text('# Demo\n')
+    return StructureIndex(ProjectIndex(str(tmp_path)))
+
+
+def test_calls_keep_their_receiver_and_skip_stdlib():
+    calls = parse_module('index.py', INDEX_PY).calls
+    assert calls['ProjectIndex.files'] == {'self.refresh'}
+    assert calls['ProjectIndex.refresh'] == set()
+    assert calls['ProjectIndex.search'] == set()
+    assert calls['build'] == {'index.refresh', 'index.search'}
+
+
+def test_tree_lists_every_file(index):
+    tree = index.tree()
+    assert tree.startswith('3 files')
+    assert 'index.py' in tree and 'README.md' in tree
+
+
+def test_definitions(index):
+    assert [(s.path, s.line) for s in index.definitions('ProjectIndex.refresh')] == [('index.py', 6)]
+    assert sorted(s.qualname for s in index.definitions('refresh')) == ['ProjectIndex.refresh', 'View.refresh']
+
+
+def test_callers_of_a_method(index):
+    assert index.callers('search') == [('index.py', 'build', 'index.search')]
+    assert index.callers('ProjectIndex.refresh') == [('index.py', 'ProjectIndex.files', 'self.refresh'),
+                                                     ('index.py', 'build', 'index.refresh')]
+
+
+def test_describe_uses_only_the_named_symbol(index):
+    text = structure.describe_callers(index, 'build')
+    assert text == "build is called from:\n- view.py: View.refresh (build)"
+    assert structure.describe_callers(index, 'files') == "Nothing in the project calls files."
+    assert structure.describe_definitions(index, 'projectindex').startswith('ProjectIndex is defined in:')
+    assert structure.describe_definitions(index, 'missing') is None
+    assert structure.describe_callers(index, 'calls') is None
+
+
+def test_outline_names_importers(index):
+    text = structure.describe_outline(index, 'outline index.py')
+    assert '5: class ProjectIndex' in text
+    assert 'imported by: view.py' in text
@@ -0,0 +1,25 @@
+from src.project_index import IndexedFile
+from src.summaries import MIN_SYNOPSIS_CHARS, SummaryCache
+
+
+def _files(n):
+    content = 'x = 1\n' * (MIN_SYNOPSIS_CHARS // 6 + 1)
+    return [IndexedFile(f"m{i}.py", f"/tmp/m{i}.py", 0.0, len(content), content + f"# {i}\n") for i in range(n)]
+
+
+def test_summarize_pending_stops_when_busy(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'f.db'))
+    prompts = []
+
+    def complete(prompt):
+        prompts.append(prompt)
+        return 'A module.'
+
+    assert cache.summarize_pending(_files(3), complete, busy=lambda: len(prompts) >= 1) == 1
+    assert cache.summarize_pending(_files(3), complete, busy=lambda: False) == 2
+    assert len(prompts) == 3
+
+
+def test_summarize_pending_does_nothing_while_busy(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'f.db'))
+    assert cache.summarize_pending(_files(2), lambda prompt: 'A module.', busy=lambda: True) == 0